@@ -4,27 +4,58 @@ import subprocess
 import re
 import csv
 import time
+import math
 import argparse
+import statistics
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Configuration
+from src.model.graph import Graph
+from src.model.coordinate_graph import COORDINATE_EXTENSION
+from src.model.trace import ConvergenceTrace
+from src.model.profiling import Profiler
+from src.solvers import SOLVERS, instrument_solvers
+
+# Instance files collected in the --instances directory (not the asymmetric
+# TSPLIB .atsp files: the heuristics only handle symmetric weights)
+INSTANCE_EXTENSIONS = (".in", COORDINATE_EXTENSION, ".tsp")
+
+# Seconds allowed past the timeout before an isolated run is killed
+KILL_GRACE = 2
+
+# Algorithms scheduled first by parallel runs (they often use their whole timeout)
+LONG_RUNNING = ["Exact"]
+
+# Scripts taking --timeout and --seed options (script mode)
+CONFIGURABLE_SCRIPTS = ["Exact", "GRASP_LS", "LK"]
+
+# Two-sided 95% Student t quantiles by degrees of freedom (larger: normal 1.96)
+T_QUANTILES_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+                  9: 2.262, 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042}
+
+# Configuration (script mode: one interpreter per run)
 ALGORITHMS = {
     "Exact": "src/exact/tsp_exact.py",
     "Constructive": "src/constructive/tsp_constructive.py",
     "LocalSearch": "src/local_search/tsp_local_search.py",
-    "GRASP_LS": "src/grasp/tsp_grasp_ls.py"
+    "GRASP_LS": "src/grasp/tsp_grasp_ls.py",
+    "LK": "src/lk/tsp_lk.py"
 }
 
-def get_algorithm_command(algo_name, instance_path, timeout=None):
+def get_algorithm_command(algo_name, instance_path, timeout=None, seed=None):
     script_path = ALGORITHMS[algo_name]
     cmd = [sys.executable, script_path, instance_path]
-    if timeout and algo_name in ["Exact", "GRASP_LS"]:
+    if timeout and algo_name in CONFIGURABLE_SCRIPTS:
         # Give the algorithm slightly less time than the subprocess timeout 
         # to ensure it can exit gracefully and print its final result.
         cmd.extend(["--timeout", str(max(1, int(timeout - 2)))])
+    if seed is not None and algo_name in CONFIGURABLE_SCRIPTS:
+        cmd.extend(["--seed", str(seed)])
     return cmd
 
-def run_algorithm(algo_name, instance_path, timeout=60):
-    command = get_algorithm_command(algo_name, instance_path, timeout=timeout)
+def run_algorithm(algo_name, instance_path, timeout=60, seed=None):
+    command = get_algorithm_command(algo_name, instance_path, timeout=timeout, seed=seed)
     start_time = time.time()
     try:
         # Run the command with a timeout
@@ -53,12 +84,282 @@ def run_algorithm(algo_name, instance_path, timeout=60):
     except Exception as e:
         return {"status": "Exception", "time": 0, "cost": None, "error": str(e)}
 
+def run_in_process(algo_name, graph, timeout=60, seed=None, trace_path=None, instance_name=None,
+                   profile_path=None, cprofile=False):
+    """
+    Runs a registered solver in this process on an already loaded graph.
+    Only the solve call is timed (perf_counter): no interpreter startup,
+    imports or parsing. The solvers stop by themselves at the timeout.
+    With trace_path, the convergence trace of the run is written there.
+    With profile_path, the run is profiled (src/model/profiling.py): phase
+    timings and counters written there, plus a cProfile dump next to it
+    (.prof) with cprofile. The instrumentation slows the run down, so its
+    time is not comparable with unprofiled runs.
+    """
+    # Fresh graph object on the same weights: no neighbor lists cached by a previous run
+    graph = graph.copy()
+    profiler = None
+    if profile_path:
+        profiler = Profiler(os.path.splitext(profile_path)[0] + ".prof" if cprofile else None)
+        instrument_solvers(profiler, graph)
+    try:
+        trace = ConvergenceTrace() if trace_path else None
+        if profiler is not None:
+            profiler.start()
+        start_time = time.perf_counter()
+        try:
+            _, cost = SOLVERS[algo_name](graph, timeout=timeout, seed=seed, trace=trace)
+        finally:
+            duration = time.perf_counter() - start_time
+            if profiler is not None:
+                profiler.stop()
+        if trace is not None:
+            trace.write(trace_path, instance=instance_name, algorithm=algo_name, seed=seed,
+                        time=round(duration, 6), cost=cost)
+        if profiler is not None:
+            profiler.write(profile_path, instance=instance_name, algorithm=algo_name, seed=seed,
+                           time=round(duration, 6), cost=cost)
+        return {"status": "Success", "time": duration, "cost": cost}
+    except Exception as e:
+        return {"status": "Exception", "time": 0, "cost": None, "error": f"{e}\n{traceback.format_exc()}"}
+
+def _isolated_run(connection, algo_name, graph, timeout, seed, trace_path, instance_name, profile_path, cprofile):
+    connection.send(run_in_process(algo_name, graph, timeout, seed, trace_path, instance_name, profile_path, cprofile))
+    connection.close()
+
+def run_isolated(algo_name, graph, timeout=60, seed=None, trace_path=None, instance_name=None,
+                 profile_path=None, cprofile=False):
+    """
+    Same as run_in_process, in a child process killed if it is still
+    running KILL_GRACE seconds after the timeout (hard limit).
+    """
+    ctx = multiprocessing.get_context()
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_isolated_run, args=(sender, algo_name, graph, timeout, seed, trace_path,
+                                                      instance_name, profile_path, cprofile))
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout + KILL_GRACE):
+            return receiver.recv()
+        if process.is_alive():
+            return {"status": "Timeout", "time": timeout, "cost": None}
+        return {"status": "Error", "time": 0, "cost": None, "error": f"Exit code {process.exitcode}"}
+    except EOFError:
+        return {"status": "Error", "time": 0, "cost": None, "error": f"Exit code {process.exitcode}"}
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+
+def run_file_path(directory, instance, algo_name, repeat):
+    """File of a run in a traces / profiles directory: <directory>/<instance>_<algorithm>_<repeat>.json"""
+    instance_name = os.path.splitext(os.path.basename(instance))[0]
+    return os.path.join(directory, f"{instance_name}_{algo_name}_{repeat}.json")
+
+def run_job(instance, algo_name, mode="inprocess", timeout=60, graph=None, seed=None, repeat=0, traces_dir=None,
+            profiles_dir=None, cprofile=False):
+    """
+    One benchmark run of algo_name on instance, in the given mode (the
+    instance is loaded here unless graph is given), with the seed of this
+    repeat. Writes its convergence trace in traces_dir and its profile in
+    profiles_dir (not in script mode). Returns the CSV row.
+    """
+    path = run_file_path(traces_dir, instance, algo_name, repeat) if traces_dir else None
+    profile_path = run_file_path(profiles_dir, instance, algo_name, repeat) if profiles_dir else None
+    if mode == "script":
+        res = run_algorithm(algo_name, instance, timeout=timeout, seed=seed)
+    elif graph is None:
+        try:
+            graph = Graph.load_from_file(instance)
+        except Exception as e:
+            res = {"status": "Exception", "time": 0, "cost": None, "error": f"Cannot load instance: {e}"}
+    if mode != "script" and graph is not None:
+        if mode == "isolated":
+            res = run_isolated(algo_name, graph, timeout=timeout, seed=seed, trace_path=path,
+                               instance_name=os.path.basename(instance),
+                               profile_path=profile_path, cprofile=cprofile)
+        else:
+            res = run_in_process(algo_name, graph, timeout=timeout, seed=seed, trace_path=path,
+                                 instance_name=os.path.basename(instance),
+                                 profile_path=profile_path, cprofile=cprofile)
+
+    return {
+        'Instance': os.path.basename(instance),
+        'Algorithm': algo_name,
+        'Repeat': repeat,
+        'Seed': seed,
+        'Status': res['status'],
+        'Time': f"{res['time']:.4f}",
+        'Cost': res['cost'],
+        'Error': res.get('error', '')
+    }
+
+_job_worker = {}
+
+def _init_job_worker(cpus, worker_counter):
+    """Pins each worker process to its own CPU (round robin), so runs do not share a core."""
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+    if cpus:
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+def _run_job_in_worker(instance, algo_name, mode, timeout, seed, repeat, traces_dir, profiles_dir, cprofile):
+    # Jobs of the same instance often follow each other: keep the last loaded graph
+    graph = None
+    if mode != "script":
+        if _job_worker.get('instance') != instance:
+            _job_worker.clear()
+            try:
+                _job_worker.update(instance=instance, graph=Graph.load_from_file(instance))
+            except Exception:
+                pass # run_job reports the loading error
+        graph = _job_worker.get('graph')
+    return run_job(instance, algo_name, mode, timeout, graph, seed, repeat, traces_dir, profiles_dir, cprofile)
+
+def run_seed(args, repeat):
+    """Seed of a repeat: --seed + repeat index (None without --seed)."""
+    return None if args.seed is None else args.seed + repeat
+
+def run_parallel(instance_files, args, writer, csvfile):
+    """
+    Runs every instance x algorithm x repeat job on a pool of args.jobs
+    processes, LONG_RUNNING algorithms first, writing each row as soon as
+    it completes. Returns the rows.
+    """
+    jobs = [(instance, algo_name, repeat) for instance in instance_files
+            for algo_name in ALGORITHMS for repeat in range(args.repeats)]
+    jobs.sort(key=lambda job: job[1] not in LONG_RUNNING)
+
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_setaffinity") else []
+    if cpus and args.jobs > len(cpus):
+        print(f"Warning: {args.jobs} jobs on {len(cpus)} CPUs, timings will not be comparable")
+
+    ctx = multiprocessing.get_context()
+    worker_counter = ctx.Value('i', 0)
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=ctx, initializer=_init_job_worker,
+                             initargs=(cpus, worker_counter)) as executor:
+        futures = [executor.submit(_run_job_in_worker, instance, algo_name, args.mode, args.timeout,
+                                   run_seed(args, repeat), repeat, args.traces,
+                                   args.profiles, args.cprofile)
+                   for instance, algo_name, repeat in jobs]
+        rows = []
+        for future in as_completed(futures):
+            row = future.result()
+            print(f"  {row['Instance']} {row['Algorithm']} #{row['Repeat']}: "
+                  f"{row['Status']} ({float(row['Time']):.2f}s) Cost: {row['Cost']}")
+            writer.writerow(row)
+            csvfile.flush()
+            rows.append(row)
+    return rows
+
+def load_best_known(path):
+    """Best known costs from a CSV file with Instance and Cost columns."""
+    best_known = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            best_known[row['Instance']] = float(row['Cost'])
+    return best_known
+
+def _describe(values, prefix):
+    """mean / median / min / sample std / 95% confidence half-width (Student t) of values."""
+    count = len(values)
+    if count == 0:
+        return {f"{prefix}_{stat}": '' for stat in ("mean", "median", "min", "std", "ci95")}
+    std = statistics.stdev(values) if count > 1 else 0.0
+    df = count - 1
+    quantile = T_QUANTILES_95[max(k for k in T_QUANTILES_95 if k <= df)] if 1 <= df <= 30 else 1.96
+    return {
+        f"{prefix}_mean": statistics.mean(values),
+        f"{prefix}_median": statistics.median(values),
+        f"{prefix}_min": min(values),
+        f"{prefix}_std": std,
+        f"{prefix}_ci95": quantile * std / math.sqrt(count) if count > 1 else 0.0
+    }
+
+def summarize(rows, best_known=None):
+    """
+    Aggregates the runs of every (instance, algorithm): number of runs and
+    successes, statistics of the cost and time of the successful runs, and
+    gap of the mean / best cost to the best known cost (in %). Best known
+    costs default to the best cost found by any run of the benchmark.
+    """
+    best_known = dict(best_known or {})
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['Instance'], row['Algorithm']), []).append(row)
+
+    observed = {}
+    for row in rows:
+        if row['Status'] == 'Success':
+            cost = float(row['Cost'])
+            observed[row['Instance']] = min(cost, observed.get(row['Instance'], cost))
+    for instance, cost in observed.items():
+        best_known.setdefault(instance, cost)
+
+    summary = []
+    for (instance, algo_name), runs in groups.items():
+        successes = [run for run in runs if run['Status'] == 'Success']
+        costs = [float(run['Cost']) for run in successes]
+        times = [float(run['Time']) for run in successes]
+        entry = {'Instance': instance, 'Algorithm': algo_name, 'Runs': len(runs), 'Successes': len(successes)}
+        entry.update(_describe(costs, 'Cost'))
+        entry.update(_describe(times, 'Time'))
+
+        best = best_known.get(instance)
+        entry['Best_known'] = best if best is not None else ''
+        if costs and best:
+            entry['Gap_mean'] = 100 * (entry['Cost_mean'] - best) / best
+            entry['Gap_min'] = 100 * (entry['Cost_min'] - best) / best
+        else:
+            entry['Gap_mean'] = entry['Gap_min'] = ''
+        summary.append(entry)
+    return summary
+
+def write_summary(path, summary):
+    fieldnames = ['Instance', 'Algorithm', 'Runs', 'Successes',
+                  'Cost_mean', 'Cost_median', 'Cost_min', 'Cost_std', 'Cost_ci95',
+                  'Time_mean', 'Time_median', 'Time_min', 'Time_std', 'Time_ci95',
+                  'Best_known', 'Gap_mean', 'Gap_min']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for entry in summary:
+            writer.writerow({key: f"{value:.6g}" if isinstance(value, float) else value
+                             for key, value in entry.items()})
+
 def main():
     parser = argparse.ArgumentParser(description="Benchmark TSP algorithms")
-    parser.add_argument("--instances", default="instances/new_instances", help="Directory containing .in files")
+    parser.add_argument("--instances", default="instances/new_instances",
+                        help="Directory containing .in (matrix), .xy (coordinates) or TSPLIB (.tsp) files")
     parser.add_argument("--output", default="results/results.csv", help="Output CSV file")
     parser.add_argument("--max-instances", type=int, default=None, help="Max number of instances to test per algorithm")
     parser.add_argument("--timeout", type=int, default=600, help="Timeout in seconds per run")
+    parser.add_argument("--mode", choices=["inprocess", "isolated", "script"], default="inprocess",
+                        help="inprocess: solvers called in this process, instance loaded once, only the solve timed; "
+                             "isolated: same in a child process killed after the timeout; "
+                             "script: one solver script per run (timing includes startup and parsing)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of runs executed in parallel (one process pinned to one CPU each)")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs of every instance x algorithm")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Base seed: repeat r runs with seed + r (randomized solvers)")
+    parser.add_argument("--summary", default=None,
+                        help="Aggregated statistics CSV (default: <output>_summary.csv)")
+    parser.add_argument("--traces", default=None,
+                        help="Directory receiving one convergence trace (JSON) per run (inprocess / isolated modes)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every run, written to <output directory>/profiles (see --profiles)")
+    parser.add_argument("--profiles", default=None,
+                        help="Directory receiving one profile (phase timings and counters, JSON) per run "
+                             "(inprocess / isolated modes; profiled runs are slower)")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="With --profiles, also write a cProfile dump (.prof) per run")
+    parser.add_argument("--best-known", default=None,
+                        help="CSV of best known costs (Instance, Cost) for the gaps "
+                             "(default: best cost found by the benchmark)")
     args = parser.parse_args()
 
     # Find instances
@@ -66,7 +367,7 @@ def main():
     if os.path.isdir(args.instances):
         for root, dirs, files in os.walk(args.instances):
             for file in files:
-                if file.endswith(".in"):
+                if file.endswith(INSTANCE_EXTENSIONS):
                     instance_files.append(os.path.join(root, file))
     else:
         print(f"Error: {args.instances} is not a directory.")
@@ -80,42 +381,69 @@ def main():
 
     print(f"Found {len(instance_files)} instances. Starting benchmark...")
 
-    results = []
-
     # Ensure output directory exists
     output_dir = os.path.dirname(args.output)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    if args.traces:
+        if args.mode == "script":
+            print("Warning: convergence traces are not collected in script mode")
+            args.traces = None
+        else:
+            os.makedirs(args.traces, exist_ok=True)
+    # Runs may execute in other processes (--jobs, isolated mode): each profile
+    # goes to its own file rather than to the interleaved standard output
+    if args.profile and not args.profiles:
+        args.profiles = os.path.join(output_dir or ".", "profiles")
+    if args.profiles:
+        if args.mode == "script":
+            print("Warning: profiles are not collected in script mode")
+            args.profiles = None
+        else:
+            os.makedirs(args.profiles, exist_ok=True)
 
     # Prepare CSV
     with open(args.output, 'w', newline='') as csvfile:
-        fieldnames = ['Instance', 'Algorithm', 'Status', 'Time', 'Cost', 'Error']
+        fieldnames = ['Instance', 'Algorithm', 'Repeat', 'Seed', 'Status', 'Time', 'Cost', 'Error']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
 
-        for instance in instance_files:
-            instance_name = os.path.basename(instance)
-            print(f"\nProcessing {instance_name}...")
-            
-            for algo_name in ALGORITHMS:
-                print(f"  Running {algo_name}...", end=" ", flush=True)
-                
-                # For exact method, likely skip large instances if logic requires, but we rely on timeout for now
-                
-                res = run_algorithm(algo_name, instance, timeout=args.timeout)
-                
-                print(f"{res['status']} ({res['time']:.2f}s) Cost: {res['cost']}")
-                
-                row = {
-                    'Instance': instance_name,
-                    'Algorithm': algo_name,
-                    'Status': res['status'],
-                    'Time': f"{res['time']:.4f}",
-                    'Cost': res['cost'],
-                    'Error': res.get('error', '')
-                }
-                writer.writerow(row)
-                results.append(row)
+        if args.jobs > 1:
+            rows = run_parallel(instance_files, args, writer, csvfile)
+        else:
+            rows = []
+            for instance in instance_files:
+                instance_name = os.path.basename(instance)
+                print(f"\nProcessing {instance_name}...")
+
+                graph = None
+                if args.mode != "script":
+                    try:
+                        graph = Graph.load_from_file(instance)
+                    except Exception as e:
+                        print(f"  Cannot load {instance_name}: {e}")
+                        continue
+
+                for algo_name in ALGORITHMS:
+                    for repeat in range(args.repeats):
+                        label = f" #{repeat}" if args.repeats > 1 else ""
+                        print(f"  Running {algo_name}{label}...", end=" ", flush=True)
+
+                        row = run_job(instance, algo_name, args.mode, args.timeout, graph,
+                                      run_seed(args, repeat), repeat, args.traces,
+                                      args.profiles, args.cprofile)
+
+                        print(f"{row['Status']} ({float(row['Time']):.2f}s) Cost: {row['Cost']}")
+
+                        # Written right away: an interrupted run keeps its results
+                        writer.writerow(row)
+                        csvfile.flush()
+                        rows.append(row)
+
+    summary_path = args.summary or os.path.splitext(args.output)[0] + "_summary.csv"
+    best_known = load_best_known(args.best_known) if args.best_known else None
+    write_summary(summary_path, summarize(rows, best_known))
+    print(f"Aggregated statistics saved to {summary_path}")
 
     print(f"\nBenchmark complete. Results saved to {args.output}")
 
@@ -11,7 +11,8 @@ ALGORITHMS = {
     "Exact": "src/exact/tsp_exact.py",
     "Constructive": "src/constructive/tsp_constructive.py",
     "LocalSearch": "src/local_search/tsp_local_search.py",
-    "GRASP_LS": "src/grasp/tsp_grasp_ls.py"
+    "GRASP_LS": "src/grasp/tsp_grasp_ls.py",
+    "LK": "src/lk/tsp_lk.py"
 }
 
 def get_algorithm_command(algo_name, instance_path):
@@ -5,6 +5,8 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import glob
+import json
 import argparse
 
 def plot_per_algorithm_performance(df, output_dir):
@@ -112,6 +114,163 @@ def plot_per_instance_performance(df, output_dir):
         plt.close()
         print(f"Saved performance plot for {instance} to {plot_path}")
 
+def plot_with_error_bars(summary_df, value, ylabel, title, plot_path, log_scale=True):
+    """
+    Grouped bar chart of the mean of value per instance and algorithm,
+    with +/- one standard deviation error bars (aggregated benchmark data).
+    """
+    instances = sorted(summary_df['Instance'].unique())
+    algorithms = sorted(summary_df['Algorithm'].unique())
+    width = 0.8 / len(algorithms)
+    colors = sns.color_palette("viridis", len(algorithms))
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for index, algo in enumerate(algorithms):
+        algo_df = summary_df[summary_df['Algorithm'] == algo].set_index('Instance').reindex(instances)
+        positions = [i + (index - (len(algorithms) - 1) / 2) * width for i in range(len(instances))]
+        ax.bar(
+            positions,
+            algo_df[f"{value}_mean"],
+            width,
+            yerr=algo_df[f"{value}_std"].fillna(0),
+            capsize=3,
+            color=colors[index],
+            label=algo
+        )
+
+    ax.set_xticks(range(len(instances)))
+    ax.set_xticklabels(instances, rotation=45)
+    ax.set_xlabel("Instance", fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    if log_scale:
+        ax.set_yscale("log")
+    ax.legend(title="Algorithm", bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.title(title, fontsize=16)
+    plt.tight_layout()
+    plt.savefig(plot_path)
+    plt.close()
+    print(f"Saved plot to {plot_path}")
+
+def plot_summary_results(summary_path, output_dir):
+    """
+    Error bar plots (mean +/- std over the repeats) of the cost, time and
+    gap to the best known cost, from the aggregated CSV of benchmark.py.
+    """
+    try:
+        summary_df = pd.read_csv(summary_path)
+    except FileNotFoundError:
+        print(f"Error: Could not find file {summary_path}")
+        return
+
+    summary_df = summary_df[summary_df['Successes'] > 0]
+    if summary_df.empty:
+        print("No successful runs found to plot.")
+        return
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    plot_with_error_bars(summary_df, "Cost", "Cost (mean ± std, Log Scale)", "Cost by Algorithm over Repeats",
+                         os.path.join(output_dir, "comparison_cost_errorbars.png"))
+    plot_with_error_bars(summary_df, "Time", "Time (seconds, mean ± std)", "Execution Time by Algorithm over Repeats",
+                         os.path.join(output_dir, "comparison_time_errorbars.png"))
+
+    # Gap of the mean cost to the best known cost, no error bars (one value per group)
+    gap_df = summary_df.dropna(subset=['Gap_mean'])
+    if not gap_df.empty:
+        plt.figure(figsize=(12, 6))
+        sns.barplot(data=gap_df, x="Instance", y="Gap_mean", hue="Algorithm", palette="viridis")
+        plt.title("Gap of the Mean Cost to the Best Known Cost", fontsize=16)
+        plt.ylabel("Gap (%)", fontsize=12)
+        plt.xlabel("Instance", fontsize=12)
+        plt.xticks(rotation=45)
+        plt.legend(title="Algorithm", bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.tight_layout()
+        gap_plot_path = os.path.join(output_dir, "comparison_gap.png")
+        plt.savefig(gap_plot_path)
+        plt.close()
+        print(f"Saved gap plot to {gap_plot_path}")
+
+def load_traces(traces_dir):
+    """Convergence traces written by benchmark.py --traces, grouped by instance."""
+    traces_by_instance = {}
+    for path in sorted(glob.glob(os.path.join(traces_dir, "*.json"))):
+        with open(path, 'r') as f:
+            trace = json.load(f)
+        if trace.get('improvements'):
+            traces_by_instance.setdefault(trace['instance'], []).append(trace)
+    return traces_by_instance
+
+def plot_convergence(traces_dir, output_dir, target_gap=1.0):
+    """
+    For each instance, from the convergence traces:
+    - cost over time: incumbent cost of every run as a step function
+    - time-to-target: fraction of the runs of each algorithm having found a
+      tour within target_gap % of the best cost of all runs, over time.
+    """
+    traces_by_instance = load_traces(traces_dir)
+    if not traces_by_instance:
+        print(f"No convergence traces found in {traces_dir}")
+        return
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    for instance, traces in sorted(traces_by_instance.items()):
+        algorithms = sorted({trace['algorithm'] for trace in traces})
+        colors = dict(zip(algorithms, sns.color_palette("viridis", len(algorithms))))
+
+        # --- Cost over time ---
+        fig, ax = plt.subplots(figsize=(10, 6))
+        labeled = set()
+        for trace in traces:
+            times = [elapsed for elapsed, _ in trace['improvements']]
+            costs = [cost for _, cost in trace['improvements']]
+            # Hold the final incumbent until the end of the run
+            times.append(max(trace['time'], times[-1]))
+            costs.append(costs[-1])
+            algo = trace['algorithm']
+            ax.step(times, costs, where='post', color=colors[algo], alpha=0.7,
+                    label=algo if algo not in labeled else None)
+            labeled.add(algo)
+
+        ax.set_xscale("log")
+        ax.set_xlabel("Time (seconds, Log Scale)", fontsize=12)
+        ax.set_ylabel("Best Cost", fontsize=12)
+        ax.legend(title="Algorithm", bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.title(f"Cost over Time: {instance}", fontsize=16)
+        plt.tight_layout()
+        plot_path = os.path.join(output_dir, f"convergence_{instance}.png")
+        plt.savefig(plot_path)
+        plt.close()
+        print(f"Saved convergence plot for {instance} to {plot_path}")
+
+        # --- Time to target ---
+        best = min(trace['improvements'][-1][1] for trace in traces)
+        target = best * (1 + target_gap / 100)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for algo in algorithms:
+            runs = [trace for trace in traces if trace['algorithm'] == algo]
+            hits = sorted(next((elapsed for elapsed, cost in trace['improvements'] if cost <= target), float('inf'))
+                          for trace in runs)
+            reached = [elapsed for elapsed in hits if elapsed != float('inf')]
+            if not reached:
+                continue
+            fractions = [(index + 1) / len(runs) for index in range(len(reached))]
+            ax.step(reached, fractions, where='post', color=colors[algo], marker='o', label=algo)
+
+        ax.set_xscale("log")
+        ax.set_ylim(0, 1.05)
+        ax.set_xlabel("Time (seconds, Log Scale)", fontsize=12)
+        ax.set_ylabel("Fraction of Runs", fontsize=12)
+        ax.legend(title="Algorithm", bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.title(f"Time to Target (within {target_gap:g}% of {best:g}): {instance}", fontsize=16)
+        plt.tight_layout()
+        plot_path = os.path.join(output_dir, f"time_to_target_{instance}.png")
+        plt.savefig(plot_path)
+        plt.close()
+        print(f"Saved time-to-target plot for {instance} to {plot_path}")
+
 def plot_benchmark_results(csv_path, output_dir):
     # Create output directory if it doesn't exist
     if not os.path.exists(output_dir):
@@ -200,9 +359,24 @@ def main():
     parser = argparse.ArgumentParser(description="Plot benchmark results")
     parser.add_argument("--csv", default="results/results.csv", help="Path to results CSV file")
     parser.add_argument("--output", default="report/sources/figures", help="Directory to save plots")
+    parser.add_argument("--summary", default=None,
+                        help="Aggregated CSV of benchmark.py for the error bar plots (default: <csv>_summary.csv if it exists)")
+    parser.add_argument("--traces", default=None,
+                        help="Directory of convergence traces (benchmark.py --traces) for the cost over time plots")
+    parser.add_argument("--target-gap", type=float, default=1.0,
+                        help="Target of the time-to-target plots, in %% above the best cost found")
     args = parser.parse_args()
 
     plot_benchmark_results(args.csv, args.output)
 
+    summary_path = args.summary or os.path.splitext(args.csv)[0] + "_summary.csv"
+    if args.summary or os.path.exists(summary_path):
+        print("\nGenerating error bar plots from the aggregated results...")
+        plot_summary_results(summary_path, args.output)
+
+    if args.traces:
+        print("\nGenerating convergence plots...")
+        plot_convergence(args.traces, args.output, args.target_gap)
+
 if __name__ == "__main__":
     main()
@@ -1,58 +1,349 @@
 import sys
 import os
+import time
+import argparse
+
+import numpy as np
 
 # Add src to python path to import model
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.model.graph import Graph
+from src.model.graph import Graph, DEFAULT_NEIGHBORS
 from src.model.utils import write_solution
+from src.model.profiling import add_profiling_arguments, profiler_from_args, profile_phase
+
+# Start vertices of multi_start_nearest_neighbor (all of them on smaller instances)
+MULTI_START_COUNT = 32
 
-def nearest_neighbor(graph):
+def nearest_neighbor(graph, num_neighbors=DEFAULT_NEIGHBORS, start=0):
     n = graph.n
-    visited = [False] * n
-    # Start at node 0
-    current_node = 0
+    visited = np.zeros(n, dtype=bool)
+    # Candidate lists: the nearest unvisited node is usually among them
+    neighbor_lists = graph.neighbors(num_neighbors)
+    current_node = start
     visited[current_node] = True
     path = [current_node]
     cost = 0
 
     for _ in range(n - 1):
-        best_dist = float('inf')
         next_node = -1
-        
-        for neighbor in range(n):
+        # The list is sorted by distance: its first unvisited entry is the nearest
+        for neighbor in neighbor_lists[current_node].tolist():
             if not visited[neighbor]:
-                dist = graph.get_weight(current_node, neighbor)
-                if dist < best_dist:
-                    best_dist = dist
-                    next_node = neighbor
-        
+                next_node = neighbor
+                break
+
         if next_node == -1:
-            # Should not happen in a complete graph
-            raise Exception("Graph is not connected or error in logic")
-            
+            # Every candidate is visited: scan all distances from the current node,
+            # with visited nodes masked out.
+            dists = np.where(visited, np.inf, graph.row(current_node))
+            next_node = int(np.argmin(dists))
+
+            if visited[next_node]:
+                # Should not happen in a complete graph
+                raise Exception("Graph is not connected or error in logic")
+
         visited[next_node] = True
         path.append(next_node)
-        cost += best_dist
+        cost += graph.get_weight(current_node, next_node)
         current_node = next_node
 
     # Return to start
     cost += graph.get_weight(current_node, path[0])
-    
+
     return path, cost
 
+def multi_start_nearest_neighbor(graph, starts=MULTI_START_COUNT, top_k=None, seed=0,
+                                 num_neighbors=DEFAULT_NEIGHBORS, deadline=None):
+    """
+    Nearest neighbor from several start vertices, keeping the best tour.
+    starts: list of start vertices, or their number: vertex 0 (so the result
+    is never worse than nearest_neighbor) and a sample of the others drawn
+    with seed, every vertex when n <= starts.
+    The tours are built together, one step of each per iteration: the first
+    unvisited entry of every neighbor list is found with array operations,
+    and a tour whose candidates are all visited scans its unvisited nodes.
+    The tour from each start is the one of nearest_neighbor(graph, start=...).
+    deadline: time.time() value past which the other starts are dropped and
+    only the tour of the first one is completed.
+    Returns the best (tour, cost), or the list of the top_k best when top_k
+    is given. Tours start at node 0 like the other constructions.
+    """
+    n = graph.n
+    if isinstance(starts, (int, np.integer)):
+        if n <= starts:
+            starts = np.arange(n)
+        else:
+            others = np.random.default_rng(seed).choice(np.arange(1, n), size=starts - 1, replace=False)
+            starts = np.concatenate(([0], others))
+    current_nodes = np.asarray(starts, dtype=np.int64)
+    count = len(current_nodes)
+    if count == 0:
+        raise ValueError("No start vertex")
+    batch = np.arange(count)
+
+    neighbor_lists = graph.neighbors(num_neighbors)
+    visited = np.zeros((count, n), dtype=bool)
+    visited[batch, current_nodes] = True
+    paths = np.empty((count, n), dtype=np.int64)
+    paths[:, 0] = current_nodes
+
+    for step in range(1, n):
+        if deadline is not None and count > 1 and time.time() > deadline:
+            count, batch = 1, batch[:1]
+            current_nodes, visited, paths = current_nodes[:1], visited[:1], paths[:1]
+
+        # First unvisited candidate of each list (the lists are sorted by distance)
+        candidates = neighbor_lists[current_nodes]
+        free = ~visited[batch[:, None], candidates]
+        next_nodes = candidates[batch, np.argmax(free, axis=1)].astype(np.int64)
+
+        # Every candidate visited: nearest of the unvisited nodes of the tour,
+        # only computing their weights (few of them once the lists run out)
+        for i in np.flatnonzero(~free.any(axis=1)).tolist():
+            remaining = np.flatnonzero(~visited[i])
+            # Lowest index among ties, like np.argmin in nearest_neighbor
+            next_nodes[i] = remaining[np.argmin(graph.get_weights(current_nodes[i], remaining))]
+
+        visited[batch, next_nodes] = True
+        paths[:, step] = next_nodes
+        current_nodes = next_nodes
+
+    tours = [(_from_node_zero(path), graph.calculate_tour_cost(path)) for path in paths.tolist()]
+    # Stable sort: the first start wins ties
+    tours.sort(key=lambda tour: tour[1])
+    return tours[0] if top_k is None else tours[:top_k]
+
+def _candidate_edges(graph, num_neighbors):
+    """
+    Edges (u, v), u < v, of the neighbor lists without duplicates, sorted by
+    (weight, u, v). Returns (us, vs) as lists.
+    """
+    n = graph.n
+    neighbor_lists = graph.neighbors(num_neighbors)
+    k = neighbor_lists.shape[1]
+    us = np.repeat(np.arange(n, dtype=np.int64), k)
+    vs = neighbor_lists.ravel().astype(np.int64)
+    keys = np.unique(np.minimum(us, vs) * n + np.maximum(us, vs))
+    us, vs = keys // n, keys % n
+    order = np.lexsort((keys, graph.get_weights(us, vs)))
+    return us[order].tolist(), vs[order].tolist()
+
+def _find(parent, v):
+    """Root of v in the union-find forest parent (path halving)."""
+    while parent[v] != v:
+        parent[v] = parent[parent[v]]
+        v = parent[v]
+    return v
+
+def _join_fragments(graph, adjacency):
+    """
+    Tour from the paths of adjacency (degree <= 2, no cycle): each path is
+    followed, and its last end joined to the nearest free end of the
+    remaining paths (nearest neighbor on the fragments).
+    """
+    n = graph.n
+    fragments = []
+    seen = np.zeros(n, dtype=bool)
+    for start in range(n):
+        if seen[start] or len(adjacency[start]) == 2:
+            continue
+        # start is an end of a path (or an isolated vertex): walk to the other end
+        fragment, previous, current = [start], -1, start
+        seen[start] = True
+        while True:
+            following = [v for v in adjacency[current] if v != previous]
+            if not following:
+                break
+            previous, current = current, following[0]
+            fragment.append(current)
+            seen[current] = True
+        fragments.append(fragment)
+
+    tour = fragments[0]
+    remaining = fragments[1:]
+    while remaining:
+        # Both ends of every remaining fragment: fragment i has ends 2i and 2i + 1
+        ends = np.array([end for fragment in remaining for end in (fragment[0], fragment[-1])])
+        best = int(np.argmin(graph.get_weights(tour[-1], ends)))
+        fragment = remaining.pop(best // 2)
+        tour.extend(fragment if best % 2 == 0 else reversed(fragment))
+    return tour
+
+def _from_node_zero(tour):
+    """Same cycle, starting at node 0 (like the nearest neighbor tour)."""
+    start = tour.index(0)
+    return tour[start:] + tour[:start]
+
+def greedy_edge(graph, num_neighbors=DEFAULT_NEIGHBORS):
+    """
+    Greedy matching tour: candidate edges (neighbor lists) by increasing
+    weight, each one kept unless one of its ends already has degree 2 or it
+    closes a cycle (union-find). The resulting paths are then joined by
+    nearest free ends. Usually shorter than the nearest neighbor tour: on
+    2,000 and 20,000 uniform points, 15-17% above a long Lin-Kernighan run,
+    against 21-23%. O(n k log(n k)) plus the joining of the remaining paths.
+    """
+    n = graph.n
+    if n < 3:
+        tour = list(range(n))
+        return tour, graph.calculate_tour_cost(tour)
+
+    adjacency = [[] for _ in range(n)]
+    parent = list(range(n))
+    edges = 0
+    for u, v in zip(*_candidate_edges(graph, num_neighbors)):
+        if len(adjacency[u]) == 2 or len(adjacency[v]) == 2:
+            continue
+        root_u, root_v = _find(parent, u), _find(parent, v)
+        if root_u == root_v:
+            continue
+        parent[root_u] = root_v
+        adjacency[u].append(v)
+        adjacency[v].append(u)
+        edges += 1
+        if edges == n - 1:
+            break # Hamiltonian path
+
+    tour = _from_node_zero(_join_fragments(graph, adjacency))
+    return tour, graph.calculate_tour_cost(tour)
+
+def _minimum_spanning_tree(graph, num_neighbors):
+    """
+    Adjacency lists of a minimum spanning tree: Kruskal on the candidate
+    edges (the exact tree on almost every instance, in O(n k log(n k))),
+    or Prim on the full graph (O(n^2) time, O(n) memory) when the
+    candidate edges do not connect the graph.
+    """
+    n = graph.n
+    adjacency = [[] for _ in range(n)]
+    parent = list(range(n))
+    edges = 0
+    for u, v in zip(*_candidate_edges(graph, num_neighbors)):
+        root_u, root_v = _find(parent, u), _find(parent, v)
+        if root_u != root_v:
+            parent[root_u] = root_v
+            adjacency[u].append(v)
+            adjacency[v].append(u)
+            edges += 1
+    if edges == n - 1:
+        return adjacency
+
+    adjacency = [[] for _ in range(n)]
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    min_dists = graph.row(0).astype(np.float64)
+    parents = np.zeros(n, dtype=np.int64)
+    for _ in range(n - 1):
+        v = int(np.argmin(np.where(in_tree, np.inf, min_dists)))
+        in_tree[v] = True
+        adjacency[v].append(int(parents[v]))
+        adjacency[int(parents[v])].append(v)
+
+        row = graph.row(v)
+        closer = ~in_tree & (row < min_dists)
+        min_dists[closer] = row[closer]
+        parents[closer] = v
+    return adjacency
+
+def double_tree(graph, num_neighbors=DEFAULT_NEIGHBORS):
+    """
+    Double-tree tour: preorder walk of a minimum spanning tree from node 0,
+    i.e. the Euler tour of the doubled tree with the repeated vertices
+    shortcut. At most twice the optimum on metric instances.
+    """
+    n = graph.n
+    if n < 3:
+        tour = list(range(n))
+        return tour, graph.calculate_tour_cost(tour)
+
+    adjacency = _minimum_spanning_tree(graph, num_neighbors)
+    tour = []
+    visited = np.zeros(n, dtype=bool)
+    stack = [0]
+    while stack:
+        v = stack.pop()
+        if visited[v]:
+            continue
+        visited[v] = True
+        tour.append(v)
+        stack.extend(u for u in reversed(adjacency[v]) if not visited[u])
+    return tour, graph.calculate_tour_cost(tour)
+
+# Bits per coordinate of the Hilbert curve grid
+HILBERT_BITS = 16
+
+def hilbert_indices(coordinates, bits=HILBERT_BITS):
+    """Position of each point along a Hilbert curve over its bounding square (2^bits x 2^bits grid)."""
+    side = 1 << bits
+    low = coordinates.min(axis=0)
+    extent = max(float((coordinates.max(axis=0) - low).max()), 1e-12)
+    cells = np.minimum(((coordinates - low) / extent * side).astype(np.int64), side - 1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+
+    indices = np.zeros(len(coordinates), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        indices += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return indices
+
+def space_filling_curve(graph):
+    """
+    Cities in the order of a Hilbert curve through the plane: O(n log n),
+    an instant tour at any scale, but a poor one: about 37% above a long
+    Lin-Kernighan run on 2,000 and 20,000 uniform points (more above the
+    optimum). Needs the coordinates of a CoordinateGraph (.xy, TSPLIB EUC_2D).
+    """
+    coordinates = getattr(graph, 'coordinates', None)
+    if coordinates is None:
+        raise ValueError("The space filling curve needs city coordinates (.xy or TSPLIB coordinate instance)")
+    tour = np.argsort(hilbert_indices(coordinates), kind='stable').tolist()
+    tour = _from_node_zero(tour)
+    return tour, graph.calculate_tour_cost(tour)
+
+# Name (--method / --init options) -> construction function(graph) -> (tour, cost)
+CONSTRUCTIONS = {
+    "nn": nearest_neighbor,
+    "multi_nn": multi_start_nearest_neighbor,
+    "greedy": greedy_edge,
+    "double_tree": double_tree,
+    "sfc": space_filling_curve
+}
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python src/constructive/tsp_constructive.py <input_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Constructive TSP Heuristics")
+    parser.add_argument("input_file", help="Path to the input file")
+    parser.add_argument("--method", choices=list(CONSTRUCTIONS), default="nn",
+                        help="nn (nearest neighbor from node 0), multi_nn (best nearest neighbor tour over "
+                             f"{MULTI_START_COUNT} start vertices), greedy (greedy edge matching), "
+                             "double_tree (minimum spanning tree walk) or sfc (Hilbert space filling curve, "
+                             "coordinate instances only)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
 
-    input_filepath = sys.argv[1]
+    input_filepath = args.input_file
     try:
-        graph = Graph.load_from_file(input_filepath)
-        tour, cost = nearest_neighbor(graph)
+        profiler = profiler_from_args(args)
+        with profile_phase(profiler, "load"):
+            graph = Graph.load_from_file(input_filepath)
+        if profiler is not None:
+            from src.solvers import instrument_solvers
+            instrument_solvers(profiler, graph)
+        tour, cost = CONSTRUCTIONS[args.method](graph)
         
         print(f"Tour: {tour}")
         print(f"Cost: {cost}")
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.format_report())
         
         write_solution(input_filepath, "constructive", tour, cost)
         
@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+
+# Memory allowed for the DP tables when the exact solver picks its method (1 GiB)
+DEFAULT_MEMORY_BUDGET = 1 << 30
+
+# Bytes per DP state: float64 cost + int8 predecessor
+BYTES_PER_STATE = 9
+
+def held_karp_memory(n):
+    """Bytes used by the Held-Karp tables for n vertices: (n - 1) * 2^(n - 1) states."""
+    if n <= 3:
+        return 0
+    return (n - 1) * (1 << (n - 1)) * BYTES_PER_STATE
+
+def held_karp(graph, deadline=None):
+    """
+    Held-Karp dynamic programming over subsets, O(n^2 2^n) time.
+    Vertex 0 is the start; vertices 1..n-1 are bits 0..n-2 of a subset S.
+    dp[S, j] = cost of the cheapest path leaving 0, visiting exactly S and
+    ending at j (j in S). Subsets are processed by increasing size and, for a
+    given size and last vertex j, all the transitions
+        dp[S, j] = min_k dp[S - {j}, k] + dist(k, j)
+    are computed at once as array operations (dp[S - {j}, k] is inf when k is
+    not in S - {j}, so the min only sees valid predecessors).
+    Works for asymmetric weights. Raises TimeoutError once deadline (a
+    time.time() value) is passed.
+    Returns (tour, cost).
+    """
+    n = graph.n
+    if n <= 3:
+        # A single cycle, in one or (n = 3, asymmetric weights) two orientations
+        tours = [list(range(n))]
+        if n == 3:
+            tours.append([0, 2, 1])
+        return min(((tour, graph.calculate_tour_cost(tour)) for tour in tours), key=lambda x: x[1])
+
+    m = n - 1
+    num_subsets = 1 << m
+    nodes = np.arange(n)
+    weights = graph.get_weights(nodes[:, None], nodes[None, :]).astype(np.float64)
+    # between[k, j] = dist(k + 1, j + 1)
+    between = weights[1:, 1:]
+
+    dp = np.full((num_subsets, m), np.inf)
+    parent = np.full((num_subsets, m), -1, dtype=np.int8)
+    singletons = 1 << np.arange(m)
+    dp[singletons, np.arange(m)] = weights[0, 1:]
+
+    # Subsets grouped by size
+    subsets = np.arange(num_subsets)
+    sizes = np.zeros(num_subsets, dtype=np.int8)
+    for bit in range(m):
+        sizes += (subsets >> bit) & 1
+    subsets_by_size = np.split(np.argsort(sizes, kind='stable'), np.cumsum(np.bincount(sizes, minlength=m + 1))[:-1])
+
+    for size in range(2, m + 1):
+        if deadline is not None and time.time() > deadline:
+            raise TimeoutError()
+
+        layer = subsets_by_size[size]
+        for j in range(m):
+            targets = layer[(layer >> j) & 1 == 1]
+            candidates = dp[targets ^ (1 << j)] + between[:, j]
+            best_k = np.argmin(candidates, axis=1)
+            dp[targets, j] = candidates[np.arange(len(targets)), best_k]
+            parent[targets, j] = best_k
+
+    # Close the tour back to vertex 0
+    full = num_subsets - 1
+    last = int(np.argmin(dp[full] + weights[1:, 0]))
+
+    # Walk the predecessors back from the full subset
+    reversed_path = []
+    subset, j = full, last
+    while j >= 0:
+        reversed_path.append(j + 1)
+        previous = int(parent[subset, j])
+        subset ^= 1 << j
+        j = previous
+
+    tour = [0] + reversed_path[::-1]
+    return tour, graph.calculate_tour_cost(tour)
@@ -0,0 +1,108 @@
+import math
+import time
+
+import numpy as np
+
+from src.constructive.tsp_constructive import multi_start_nearest_neighbor
+
+# Default number of subgradient iterations of the root bound
+SUBGRADIENT_ITERATIONS = 1000
+
+def symmetric_weights(graph):
+    """
+    Dense float weights min(dist(i, j), dist(j, i)).
+    Any tour costs at least as much with these weights, so bounds computed on
+    them are valid for asymmetric instances too.
+    """
+    nodes = np.arange(graph.n)
+    weights = graph.get_weights(nodes[:, None], nodes[None, :]).astype(np.float64)
+    return np.minimum(weights, weights.T)
+
+def one_tree(weights, penalties):
+    """
+    Minimum 1-tree for the penalized weights w[i, j] + pi[i] + pi[j]:
+    a minimum spanning tree of vertices 1..n-1 (Prim) plus the two cheapest
+    edges of vertex 0.
+    Returns (penalized cost, degree of every vertex).
+    """
+    n = len(weights)
+    penalized = weights + penalties[:, None] + penalties[None, :]
+    degrees = np.zeros(n, dtype=np.int64)
+
+    sub = penalized[1:, 1:]
+    m = n - 1
+    in_tree = np.zeros(m, dtype=bool)
+    in_tree[0] = True
+    min_dists = sub[0].copy()
+    parents = np.zeros(m, dtype=np.int64)
+    cost = 0.0
+    for _ in range(m - 1):
+        v = int(np.argmin(np.where(in_tree, np.inf, min_dists)))
+        in_tree[v] = True
+        cost += min_dists[v]
+        degrees[v + 1] += 1
+        degrees[parents[v] + 1] += 1
+
+        closer = ~in_tree & (sub[v] < min_dists)
+        min_dists[closer] = sub[v][closer]
+        parents[closer] = v
+
+    # Vertex 0 joins the tree with its two cheapest edges
+    from_zero = penalized[0, 1:]
+    two = np.argpartition(from_zero, 1)[:2]
+    cost += from_zero[two].sum()
+    degrees[two + 1] += 1
+    degrees[0] = 2
+
+    return cost, degrees
+
+def one_tree_lower_bound(graph, upper_bound=None, iterations=SUBGRADIENT_ITERATIONS, weights=None, deadline=None):
+    """
+    Held-Karp lower bound: maximizes the Lagrangian
+        L(pi) = min 1-tree(w + pi) - 2 * sum(pi)
+    by subgradient ascent (subgradient deg - 2, Polyak step towards
+    upper_bound, step factor halved when the bound stalls).
+    upper_bound: cost of a known tour (nearest neighbor tour by default).
+    deadline: time.time() value at which the ascent stops early, keeping the
+    best penalties found so far (each iteration is an O(n^2) Prim pass).
+    Returns (bound, penalties): L(pi) <= optimal tour cost for the returned pi,
+    rounded up for integral weights. Usable on its own to report optimality gaps.
+    """
+    n = graph.n
+    if n < 3:
+        tour = list(range(n))
+        return graph.calculate_tour_cost(tour), np.zeros(n)
+
+    if weights is None:
+        weights = symmetric_weights(graph)
+    if upper_bound is None:
+        upper_bound = multi_start_nearest_neighbor(graph)[1]
+
+    penalties = np.zeros(n)
+    best_bound, best_penalties = -np.inf, penalties.copy()
+    step_factor = 2.0
+    stall, stall_limit = 0, max(5, n // 2)
+
+    for _ in range(iterations):
+        cost, degrees = one_tree(weights, penalties)
+        bound = cost - 2 * penalties.sum()
+        if bound > best_bound + 1e-9:
+            best_bound, best_penalties = bound, penalties.copy()
+            stall = 0
+        else:
+            stall += 1
+            if stall >= stall_limit:
+                step_factor /= 2
+                stall = 0
+
+        subgradient = degrees - 2
+        norm = (subgradient * subgradient).sum()
+        if norm == 0 or best_bound >= upper_bound - 1e-9 or step_factor < 1e-6:
+            break # The 1-tree is a tour (optimal), or no more progress
+        if deadline is not None and time.time() > deadline:
+            break # Any penalties give a valid bound
+        penalties = penalties + step_factor * (upper_bound - bound) / norm * subgradient
+
+    if graph.is_integral():
+        return math.ceil(best_bound - 1e-6), best_penalties
+    return float(best_bound), best_penalties
@@ -1,85 +1,307 @@
 import sys
 import os
+import math
 import time
+import queue
 import argparse
+import multiprocessing
+
+import numpy as np
 
 # Add src to python path to import model
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.model.graph import Graph
-from src.model.utils import write_solution
+from src.model.utils import write_solution, read_solution
+from src.model.profiling import add_profiling_arguments, profiler_from_args, profile_phase
+from src.constructive.tsp_constructive import multi_start_nearest_neighbor
+from src.local_search.tsp_local_search import LOCAL_SEARCHES
+from src.grasp.tsp_grasp_ls import grasp_ls, construction_time
+from src.lk.tsp_lk import lin_kernighan
+from src.exact.held_karp import held_karp, held_karp_memory, DEFAULT_MEMORY_BUDGET
+from src.exact.one_tree import one_tree_lower_bound, symmetric_weights
+
+# Nodes expanded between two timeout checks of the branch and bound
+TIMEOUT_CHECK_INTERVAL = 1024
+
+# Initial subproblems per worker of the parallel branch and bound
+TASKS_PER_WORKER = 4
+
+# Seconds given to the workers after the deadline to report their last results
+DEADLINE_GRACE = 0.5
+
+# Largest instance searched by solve: the search keeps n x n tables of weights
+# as Python lists (a few hundred MB at 1000 vertices, several GB at 10000).
+# Larger instances get their initial tour back.
+MAX_SEARCH_VERTICES = 1000
+
+# Heuristics available to compute the initial incumbent (see warm_start_tour)
+WARM_STARTS = ["nn", "local_search", "grasp", "lk"]
+
+# Default time budget of the warm start heuristic (seconds)
+WARM_START_BUDGET = 2
+
+def warm_start_tour(graph, source="lk", budget=WARM_START_BUDGET, seed=None):
+    """
+    Initial incumbent of the exact solver.
+    source: "nn" (multi-start nearest neighbor), "local_search" (2-opt from
+    it), "grasp" or "lk" (with seed), or the path of a solution file (as
+    written by write_solution).
+    budget (seconds) is a deadline for every heuristic source: they stop
+    there with their current tour. A tour is needed, so the nearest neighbor
+    tour of the first start is always completed, and "grasp" falls back to
+    "nn" when one of its constructions would not fit in the budget.
+    Returns the tour.
+    The heuristic sources need symmetric weights (see check_symmetric):
+    asymmetric instances start from the nearest neighbor tour instead.
+    """
+    deadline = time.time() + budget
+    if source in ("local_search", "grasp", "lk") and not graph.is_symmetric():
+        source = "nn"
+    if source == "grasp" and construction_time(graph) > budget:
+        source = "nn"
+    if source == "nn":
+        return multi_start_nearest_neighbor(graph, deadline=deadline)[0]
+    if source == "local_search":
+        tour = multi_start_nearest_neighbor(graph, deadline=deadline)[0]
+        return LOCAL_SEARCHES["2opt"](graph, tour, deadline=deadline)[0]
+    if source == "grasp":
+        return grasp_ls(graph, timeout=max(0, deadline - time.time()), seed=seed)[0]
+    if source == "lk":
+        tour = multi_start_nearest_neighbor(graph, deadline=deadline)[0]
+        return lin_kernighan(graph, tour, timeout=max(0, deadline - time.time()), seed=seed)[0]
+    if os.path.exists(source):
+        return read_solution(source)[0]
+    raise ValueError(f"Unknown warm start: {source} (expected one of {WARM_STARTS} or a solution file)")
 
 class TSPSolverExact:
-    def __init__(self, graph):
+    def __init__(self, graph, initial_tour=None):
+        """
+        initial_tour: known tour used as the initial incumbent (upper bound),
+        e.g. from warm_start_tour. Multi-start nearest neighbor tour by default.
+        """
         self.graph = graph
         self.n = graph.n
-        
-        # Heuristic optimization: Initialize with a greedy solution (Upper Bound)
+        # Rows of the weights as lists, built by _prepare_bound_caches
+        self.dist = None
+
+        # Heuristic optimization: Initialize with a heuristic solution (Upper Bound)
         # instead of infinity, to facilitate earlier pruning.
-        self.best_path, self.best_cost = self._initial_solution()
+        if initial_tour is None:
+            initial_tour = multi_start_nearest_neighbor(graph)[0]
+        self.best_path, self.best_cost = self._initial_solution(initial_tour)
         
         self.visited = [False] * self.n
         self.visited[0] = True
+        # Integral weights: bounds can be rounded up, costs stay integers
+        self.integral = graph.is_integral()
 
         # Default 30 minutes timeout
         self.timeout = 600 
         self.start_time = None
 
-    def solve(self, timeout=600):
+        self.bound = "onetree"
+        # Optional ConvergenceTrace of the running solve
+        self.trace = None
+        # Search statistics of the branch and bound
+        # Children discarded by the lower bound (pruned) or by their partial
+        # cost alone (cut: the remaining children of the node cost even more)
+        self.nodes_expanded = 0
+        self.nodes_pruned = 0
+        self.nodes_cut = 0
+        # Lower bound on the optimal cost proven at the root (for gap reporting)
+        self.lower_bound = 0
+
+    def _prepare_one_tree(self, penalties=None):
+        """
+        Computes the root 1-tree bound and its node penalties pi once
+        (or takes the given penalties, computed by another solver). The
+        subgradient ascent stops at the timeout with the best penalties so far.
+        The penalized weights w[i][j] + pi[i] + pi[j] are kept as lists and
+        reused unchanged by every node of the search (see _branch_and_bound).
+        """
+        weights = symmetric_weights(self.graph)
+        if penalties is None:
+            self.lower_bound, penalties = one_tree_lower_bound(self.graph, upper_bound=self.best_cost, weights=weights,
+                                                               deadline=self.start_time + self.timeout)
+        penalties = np.asarray(penalties, dtype=np.float64)
+        self.penalties = penalties.tolist()
+        self.penalized = (weights + penalties[:, None] + penalties[None, :]).tolist()
+
+    def solve(self, timeout=600, method="auto", memory_budget=DEFAULT_MEMORY_BUDGET, bound="onetree", workers=1,
+              trace=None):
+        """
+        method: "bnb" (branch and bound), "held_karp" (dynamic programming) or
+        "auto": Held-Karp when its tables fit in memory_budget bytes
+        (about n <= 23 for 1 GiB), branch and bound otherwise.
+        Above MAX_SEARCH_VERTICES vertices the branch and bound is not run
+        (method "initial"): its tables would not fit in memory, the initial
+        tour is returned as is.
+        bound: lower bound of the branch and bound, "onetree" (Held-Karp
+        1-tree bound with subgradient-optimized penalties) or "mst"
+        (MST of the unvisited nodes + two connecting edges).
+        workers: number of processes of the branch and bound (see
+        _parallel_branch_and_bound).
+        trace: optional ConvergenceTrace receiving the incumbents (the
+        initial one first) and the node counters.
+        """
         self.timeout = timeout
         self.start_time = time.time()
+        self.trace = trace
+        if trace is not None:
+            trace.record(self.best_cost)
+        if method == "auto":
+            method = "held_karp" if held_karp_memory(self.n) <= memory_budget else "bnb"
+        if method == "bnb" and self.n > MAX_SEARCH_VERTICES:
+            method = "initial"
+        self.method = method
+        self.bound = bound
+
         try:
-            # Path starts with node 0
-            self._branch_and_bound([0], 0)
+            if method == "held_karp":
+                path, cost = held_karp(self.graph, deadline=self.start_time + timeout)
+                if cost < self.best_cost:
+                    self._new_best(path, cost)
+                self.lower_bound = self.best_cost
+            elif method == "bnb":
+                if bound == "onetree":
+                    self._prepare_one_tree()
+                self._prepare_bound_caches()
+                if time.time() - self.start_time > self.timeout:
+                    raise TimeoutError() # The root bound took the whole budget
+                # Path starts with node 0 (nothing to search if the root bound is tight)
+                if self.lower_bound < self.best_cost:
+                    if workers > 1:
+                        self._parallel_branch_and_bound(workers)
+                    else:
+                        self._branch_and_bound([0])
+                # Search completed: the incumbent is optimal
+                self.lower_bound = self.best_cost
         except TimeoutError:
             pass # Return best found so far
+        if trace is not None:
+            trace.set_counter('nodes_expanded', self.nodes_expanded)
+            trace.set_counter('nodes_pruned', self.nodes_pruned)
+            trace.set_counter('nodes_cut', self.nodes_cut)
         return self.best_path, self.best_cost
 
-    def _initial_solution(self):
+    def _parallel_branch_and_bound(self, workers):
         """
-        Generates an initial solution using a Nearest Neighbor heuristic.
+        Parallel branch and bound: the search tree is split at a shallow depth
+        into at least TASKS_PER_WORKER * workers path prefixes, explored by a
+        pool of worker processes (see _bnb_worker_loop) pulling them from a
+        shared task queue.
+        The weights are placed once in shared memory, the incumbent cost is a
+        shared value every worker prunes against, and a worker whose peers are
+        idle with an empty queue gives away the untried children of its
+        shallowest open node as new tasks (work splitting).
+        The timeout keeps its meaning: the workers stop at the deadline (the
+        pool is terminated shortly after), TimeoutError is raised and the
+        best tour found so far is kept.
         """
-        visited = [False] * self.n
-        current_node = 0
-        visited[0] = True
-        path = [0]
-        cost = 0
-        
-        for _ in range(self.n - 1):
-            next_node = -1
-            min_dist = float('inf')
-            for neighbor in range(self.n):
-                if not visited[neighbor]:
-                    dist = self.graph.get_weight(current_node, neighbor)
-                    if dist < min_dist:
-                        min_dist = dist
-                        next_node = neighbor
-            
-            visited[next_node] = True
-            path.append(next_node)
-            cost += min_dist
-            current_node = next_node
-            
-        cost += self.graph.get_weight(current_node, 0)
-        return path, cost
+        deadline = self.start_time + self.timeout
+        ctx = multiprocessing.get_context()
+        shared_best = ctx.Value('d', float(self.best_cost))
+        outstanding = ctx.Value('i', 0)
+        idle = ctx.Value('i', 0)
+        tasks = ctx.Queue()
+        results = ctx.Queue()
+
+        # Breadth-first split, children in greedy order
+        prefixes = [[0]]
+        while len(prefixes) < TASKS_PER_WORKER * workers and len(prefixes[0]) < self.n - 1:
+            prefixes = [prefix + [v] for prefix in prefixes
+                        for v in self.sorted_rows[prefix[-1]] if v not in prefix]
+        outstanding.value = len(prefixes)
+        for prefix in prefixes:
+            tasks.put(prefix)
+
+        penalties = self.penalties if self.bound == "onetree" else None
+        shm, spec = self.graph.to_shared_memory()
+        pool = ctx.Pool(workers, initializer=_init_bnb_worker,
+                        initargs=(spec, self.best_path, self.bound, penalties, deadline, shared_best, outstanding, idle,
+                                  tasks, results))
+        try:
+            finished = pool.map_async(_bnb_worker_loop, range(workers))
+            while not (finished.ready() and results.empty()):
+                try:
+                    message = results.get(timeout=0.1)
+                except queue.Empty:
+                    if time.time() > deadline + DEADLINE_GRACE:
+                        break
+                    continue
 
-    def _calculate_mst_cost(self, unvisited_nodes):
+                kind, first, second, *rest = message
+                if kind == "best":
+                    if second < self.best_cost:
+                        self._new_best(first, second)
+                else: # "stats" of a finished task
+                    self.nodes_expanded += first
+                    self.nodes_pruned += second
+                    self.nodes_cut += rest[0]
+            complete = outstanding.value == 0
+        finally:
+            # Tasks still running at the deadline are abandoned
+            pool.terminate()
+            pool.join()
+            shm.close()
+            shm.unlink()
+
+        if not complete:
+            raise TimeoutError()
+
+    def _initial_solution(self, tour):
         """
-        Calculates the weight of the Minimum Spanning Tree (MST) for the unvisited nodes
-        using Prim's algorithm.
+        Checks the initial tour and rotates it to start at node 0, like the
+        paths of the search. Returns (path, cost).
         """
-        if not unvisited_nodes:
-            return 0
-            
-        mst_cost = 0
-        node_indices = list(unvisited_nodes)
+        tour = [int(node) for node in tour]
+        if sorted(tour) != list(range(self.n)):
+            raise ValueError(f"The initial tour is not a permutation of the {self.n} vertices")
+
+        start = tour.index(0) if tour else 0
+        path = tour[start:] + tour[:start]
+        return path, self.graph.calculate_tour_cost(path)
+
+    def _prepare_bound_caches(self):
+        """
+        Data reused by every node of the branch and bound:
+        - dist: the rows of the weight array as plain lists. The search works
+          on k <= ~20 vertices per node, where the per-call overhead of array
+          operations outweighs their benefit, so the scalar lookups of the
+          bound read lists.
+        - tree_weights: symmetric weights the spanning trees are built on
+          (penalized by the root 1-tree penalties for the onetree bound)
+        - sorted_rows[v]: all vertices sorted by weight from v, and
+          to_start_order: vertices sorted by weight to the start node, so the
+          min edge terms of the MST bound are found by skipping visited vertices.
+        """
+        self.dist = [self.graph.row(i).tolist() for i in range(self.n)]
+        if self.bound == "onetree":
+            self.tree_weights = self.penalized
+        else:
+            self.tree_weights = symmetric_weights(self.graph).tolist()
+        self.sorted_rows = [sorted(range(self.n), key=row.__getitem__) for row in self.dist]
+        self.to_start_order = sorted(range(self.n), key=lambda u: self.dist[u][0])
+
+    def _minimum_spanning_tree(self, nodes):
+        """
+        Minimum spanning tree of nodes for the tree weights, Prim's algorithm.
+        Returns (cost, edges), edges as (weight, a, b) tuples.
+        """
+        weights = self.tree_weights
+        node_indices = list(nodes)
         num_nodes = len(node_indices)
-        
-        # Map original node indices to 0..k
+        if num_nodes == 0:
+            return 0, []
+
         local_visited = [False] * num_nodes
         min_dists = [float('inf')] * num_nodes
+        parents = [-1] * num_nodes
         min_dists[0] = 0 # Start with the first node in the set
-        
+        mst_cost = 0
+        edges = []
+
         for _ in range(num_nodes):
             # Find min dist node
             u_local = -1
@@ -88,112 +310,393 @@ class TSPSolverExact:
                 if not local_visited[i] and min_dists[i] < min_val:
                     min_val = min_dists[i]
                     u_local = i
-            
-            if u_local == -1: 
-                break # Should not happen if graph is connected
-                
+
             local_visited[u_local] = True
-            mst_cost += min_val
-            
-            # Update neighbors
             u_original = node_indices[u_local]
+            if parents[u_local] >= 0:
+                mst_cost += min_val
+                edges.append((min_val, node_indices[parents[u_local]], u_original))
+
+            # Update neighbors
+            dist_u = weights[u_original]
             for v_local in range(num_nodes):
                 if not local_visited[v_local]:
-                    v_original = node_indices[v_local]
-                    weight = self.graph.get_weight(u_original, v_original)
+                    weight = dist_u[node_indices[v_local]]
                     if weight < min_dists[v_local]:
                         min_dists[v_local] = weight
-                        
-        return mst_cost
+                        parents[v_local] = u_local
+
+        return mst_cost, edges
 
-    def _lower_bound(self, last_node, unvisited_nodes, start_node=0):
+    def _remove_vertex(self, tree, v):
         """
-        Estimates the lower bound of completing the tour.
-        LB = current_cost + MST(unvisited) + min_edge_to_enter_MST + min_edge_to_return_start
+        Repairs a minimum spanning tree (cost, edges) after removing vertex v.
+        The tree edges not touching v stay in a minimum spanning tree of the
+        remaining vertices, so only the components left by v (one per tree
+        neighbor of v) have to be reconnected, with the cheapest edges between
+        them (Kruskal on the components). Removing a leaf costs O(k).
+        """
+        cost, edges = tree
+        kept = []
+        neighbors = []
+        for edge in edges:
+            weight, a, b = edge
+            if a == v:
+                neighbors.append(b)
+                cost -= weight
+            elif b == v:
+                neighbors.append(a)
+                cost -= weight
+            else:
+                kept.append(edge)
+
+        if len(neighbors) <= 1:
+            return cost, kept
+
+        # Label the components by a traversal from each former neighbor of v
+        adjacency = {}
+        for _, a, b in kept:
+            adjacency.setdefault(a, []).append(b)
+            adjacency.setdefault(b, []).append(a)
+        label = {}
+        components = []
+        for index, root in enumerate(neighbors):
+            label[root] = index
+            members = [root]
+            stack = [root]
+            while stack:
+                u = stack.pop()
+                for x in adjacency.get(u, ()):
+                    if x not in label:
+                        label[x] = index
+                        members.append(x)
+                        stack.append(x)
+            components.append(members)
+
+        # Cheapest edge between every pair of components
+        weights = self.tree_weights
+        candidates = []
+        for i in range(len(components)):
+            for j in range(i):
+                best = (float('inf'), -1, -1)
+                for a in components[i]:
+                    row = weights[a]
+                    for b in components[j]:
+                        if row[b] < best[0]:
+                            best = (row[b], a, b)
+                candidates.append((best, i, j))
+        candidates.sort()
+
+        # Kruskal on the components (union-find over component indices)
+        group = list(range(len(components)))
+        def find(i):
+            while group[i] != i:
+                group[i] = group[group[i]]
+                i = group[i]
+            return i
+
+        for edge, i, j in candidates:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                group[ri] = rj
+                kept.append(edge)
+                cost += edge[0]
+
+        return cost, kept
+
+    def _first_unvisited(self, order, skip):
+        """First vertex of order that is unvisited and not skip (None if there is none)."""
+        visited = self.visited
+        for u in order:
+            if not visited[u] and u != skip:
+                return u
+        return None
+
+    def _checkpoint(self):
+        """
+        Called by the search every TIMEOUT_CHECK_INTERVAL expanded nodes.
+        Raises TimeoutError once the timeout is reached. Returns True when
+        the search should give away its unexplored subtrees (parallel workers).
         """
-        if not unvisited_nodes:
-            return 0
-            
-        mst_cost = self._calculate_mst_cost(unvisited_nodes)
-        
-        # Min edge from last_node to any unvisited node
-        min_to_mst = float('inf')
-        for node in unvisited_nodes:
-            w = self.graph.get_weight(last_node, node)
-            if w < min_to_mst:
-                min_to_mst = w
-                
-        # Min edge from any unvisited node back to start_node
-        min_from_mst = float('inf')
-        for node in unvisited_nodes:
-            w = self.graph.get_weight(node, start_node)
-            if w < min_from_mst:
-                min_from_mst = w
-                
-        return mst_cost + min_to_mst + min_from_mst
-
-    def _branch_and_bound(self, current_path, current_cost):
         if time.time() - self.start_time > self.timeout:
-            raise TimeoutError() # Propagate up
+            raise TimeoutError()
+        return False
 
-        # Pruning based on simple cost
-        if current_cost >= self.best_cost:
-            return
+    def _new_best(self, path, cost):
+        self.best_cost = cost
+        self.best_path = path
+        if self.trace is not None:
+            self.trace.record(cost)
 
-        # Base case: valid complete tour
-        if len(current_path) == self.n:
-            last_node = current_path[-1]
-            start_node = current_path[0]
-            total_cost = current_cost + self.graph.get_weight(last_node, start_node)
-            
-            if total_cost < self.best_cost:
-                self.best_cost = total_cost
-                self.best_path = list(current_path)
-                # print(f"New best found: {self.best_cost}") # Debug
-            return
+    def _donate(self, prefixes):
+        """
+        Receives the subtrees given away after _checkpoint returned True.
+        Nothing to do here: _checkpoint never asks for it in a single process
+        (see _WorkerSolver).
+        """
 
-        # --- Stronger Pruning with Lower Bound ---
-        last_node = current_path[-1]
-        
-        # Identify unvisited nodes efficiently
-        # Since self.visited is global, we can just iterate.
-        # But for MST function it needs a list/set.
-        unvisited_nodes = [i for i in range(self.n) if not self.visited[i]]
-        
-        if unvisited_nodes:
-            # Estimate remaining cost
-            lb_remaining = self._lower_bound(last_node, unvisited_nodes)
-            if current_cost + lb_remaining >= self.best_cost:
-                return # PRUNE
+    def _branch_and_bound(self, prefix):
+        """
+        Iterative depth-first search of the tours starting with prefix (a path
+        from the start node prefix[0] = 0), with an explicit
+        stack over a preallocated path (no recursion, no path copies).
+        The node at depth d is path[:d]; its children are the unvisited
+        vertices in the presorted order of its last node, greedy-first, and
+        cursor[d] is the position of the next child to try in that order.
 
-        # --- Recursive Step with Heuristic Sorting ---
-        
-        # Candidates sorted by distance for greedy-first exploration
-        candidates = []
-        for next_node in unvisited_nodes:
-            dist = self.graph.get_weight(last_node, next_node)
-            candidates.append((dist, next_node))
-            
-        candidates.sort(key=lambda x: x[0])
-        
-        for weight, next_node in candidates:
-            self.visited[next_node] = True
-            self._branch_and_bound(current_path + [next_node], current_cost + weight)
-            self.visited[next_node] = False
+        The lower bound state is kept incrementally along the path instead of
+        being recomputed per node:
+        - onetree bound: trees[d] is the MST (penalized weights) of the
+          unvisited nodes + the start node, shared by every child v of the
+          node, whose bound is then O(1):
+          cost(trees[d]) - 2 * sum(pi[unvisited]) + pi[v] - pi[start]
+          (penalty_sums[d] = sum(pi[unvisited])). A child's tree is its
+          parent's tree with the child removed.
+        - mst bound: trees[d] is the MST of the unvisited nodes, repaired per
+          child v by removing v, plus the cheapest edges leaving v and
+          reaching the start node (first unvisited entries of the presorted orders).
+        """
+        n = self.n
+        dist, visited = self.dist, self.visited
+        sorted_rows = self.sorted_rows
+        onetree = self.bound == "onetree"
+        penalties = self.penalties if onetree else None
+        start_node = prefix[0]
+        root_depth = len(prefix)
+
+        path = [start_node] * n
+        path[:root_depth] = prefix
+        costs = [0] * (n + 1)
+        for d in range(1, root_depth):
+            visited[prefix[d]] = True
+            costs[d + 1] = costs[d] + dist[prefix[d - 1]][prefix[d]]
+        cursor = [0] * (n + 1)
+        trees = [None] * (n + 1)
+        base_bounds = [0] * (n + 1)
+        penalty_sums = [0] * (n + 1)
+
+        def enter(depth, tree, penalty_sum):
+            """Sets up the bound state of the node path[:depth] (its children are not tried yet)."""
+            cursor[depth] = 0
+            trees[depth] = tree
+            if onetree:
+                penalty_sums[depth] = penalty_sum
+                base_bounds[depth] = tree[0] - 2 * penalty_sum - penalties[start_node]
+
+        # Bound state of the prefix, from scratch
+        unvisited = [u for u in range(n) if not visited[u]]
+        if onetree:
+            enter(root_depth, self._minimum_spanning_tree(unvisited + [start_node]),
+                  sum(penalties[u] for u in unvisited))
+        else:
+            enter(root_depth, self._minimum_spanning_tree(unvisited), 0)
+        self.nodes_expanded += 1
+        depth = root_depth
+        checks_left = TIMEOUT_CHECK_INTERVAL
+
+        while depth >= root_depth:
+            if checks_left <= 0:
+                checks_left = TIMEOUT_CHECK_INTERVAL
+                if self._checkpoint():
+                    # Give away the untried children of the shallowest ancestor having
+                    # some (the subtree being explored below it is kept)
+                    for d in range(root_depth, depth):
+                        donor = path[d - 1]
+                        children = [v for v in sorted_rows[donor][cursor[d]:] if not visited[v]
+                                    and costs[d] + dist[donor][v] < self.best_cost]
+                        if children:
+                            cursor[d] = n
+                            self._donate([path[:d] + [v] for v in children])
+                            break
+
+            last_node = path[depth - 1]
+            order = sorted_rows[last_node]
+
+            # Next unvisited child in greedy order
+            i = cursor[depth]
+            while i < n and visited[order[i]]:
+                i += 1
+            cursor[depth] = i + 1
+
+            child_cost = costs[depth] + dist[last_node][order[i]] if i < n else None
+            if child_cost is None or child_cost >= self.best_cost:
+                # No child left, or sorted candidates: every further child costs more
+                if child_cost is not None:
+                    self.nodes_cut += 1
+                if depth > 1:
+                    visited[last_node] = False
+                depth -= 1
+                continue
+
+            next_node = order[i]
+
+            # Base case: valid complete tour
+            if depth + 1 == n:
+                total_cost = child_cost + dist[next_node][start_node]
+                if total_cost < self.best_cost:
+                    path[depth] = next_node
+                    self._new_best(list(path), total_cost)
+                continue
+
+            # --- Stronger Pruning with Lower Bound ---
+            if onetree:
+                child_tree = None # Built only if the child is expanded
+                lb_remaining = base_bounds[depth] + penalties[next_node]
+                if self.integral:
+                    lb_remaining = math.ceil(lb_remaining - 1e-6)
+            else:
+                child_tree = self._remove_vertex(trees[depth], next_node)
+                nearest = self._first_unvisited(sorted_rows[next_node], next_node)
+                closing = self._first_unvisited(self.to_start_order, next_node)
+                lb_remaining = child_tree[0] + dist[next_node][nearest] + dist[closing][start_node]
+            if child_cost + lb_remaining >= self.best_cost:
+                self.nodes_pruned += 1
+                continue # PRUNE
+
+            # Push the child
+            checks_left -= 1
+            self.nodes_expanded += 1
+            visited[next_node] = True
+            path[depth] = next_node
+            costs[depth + 1] = child_cost
+            if onetree:
+                enter(depth + 1, self._remove_vertex(trees[depth], next_node),
+                      penalty_sums[depth] - penalties[next_node])
+            else:
+                enter(depth + 1, child_tree, 0)
+            depth += 1
+
+        for v in prefix[1:]:
+            visited[v] = False
+
+_worker = {}
+
+class _WorkerSolver(TSPSolverExact):
+    """Branch and bound of one worker process, pruning against the shared incumbent."""
+    def _checkpoint(self):
+        super()._checkpoint()
+        shared = _worker['shared_best'].value
+        if shared < self.best_cost:
+            self.best_cost = int(shared) if self.integral else shared
+        # Split when some worker waits for work and no task is left
+        return _worker['idle'].value > 0 and _worker['tasks'].empty()
+
+    def _new_best(self, path, cost):
+        super()._new_best(path, cost)
+        shared_best = _worker['shared_best']
+        with shared_best.get_lock():
+            if cost >= shared_best.value:
+                return
+            shared_best.value = cost
+        _worker['results'].put(("best", path, cost))
+
+    def _donate(self, prefixes):
+        outstanding = _worker['outstanding']
+        with outstanding.get_lock():
+            outstanding.value += len(prefixes)
+        for prefix in prefixes:
+            _worker['tasks'].put(prefix)
+
+def _init_bnb_worker(spec, initial_tour, bound, penalties, deadline, shared_best, outstanding, idle, tasks, results):
+    graph, shm = Graph.from_shared_memory(spec)
+    # The parent's incumbent (no construction of a starting tour per worker)
+    solver = _WorkerSolver(graph, initial_tour)
+    solver.bound = bound
+    if bound == "onetree":
+        solver._prepare_one_tree(penalties)
+    solver._prepare_bound_caches()
+    solver.start_time = time.time()
+    solver.timeout = deadline - solver.start_time
+
+    _worker.update(graph=graph, shm=shm, solver=solver, shared_best=shared_best,
+                   outstanding=outstanding, idle=idle, tasks=tasks, results=results)
+
+def _bnb_worker_loop(_):
+    """
+    Explores prefixes from the task queue until every task (including the
+    ones split off by other workers) is finished, or the deadline is reached.
+    Sends the node counters of each finished task to the parent.
+    """
+    solver = _worker['solver']
+    tasks, outstanding, idle = _worker['tasks'], _worker['outstanding'], _worker['idle']
+    waiting = False
+    while True:
+        try:
+            prefix = tasks.get(timeout=0.01)
+        except queue.Empty:
+            if not waiting:
+                waiting = True
+                with idle.get_lock():
+                    idle.value += 1
+            if outstanding.value == 0:
+                return
+            continue
+
+        if waiting:
+            waiting = False
+            with idle.get_lock():
+                idle.value -= 1
+
+        solver.nodes_expanded = solver.nodes_pruned = solver.nodes_cut = 0
+        shared = _worker['shared_best'].value
+        if shared < solver.best_cost:
+            solver.best_cost = int(shared) if solver.integral else shared
+        try:
+            solver._branch_and_bound(prefix)
+        except TimeoutError:
+            _worker['results'].put(("stats", solver.nodes_expanded, solver.nodes_pruned, solver.nodes_cut))
+            return
+        _worker['results'].put(("stats", solver.nodes_expanded, solver.nodes_pruned, solver.nodes_cut))
+        with outstanding.get_lock():
+            outstanding.value -= 1
 
 def main():
-    parser = argparse.ArgumentParser(description="Exact TSP Solver (Branch and Bound)")
+    parser = argparse.ArgumentParser(description="Exact TSP Solver (Branch and Bound / Held-Karp)")
     parser.add_argument("input_file", help="Path to the input file")
     parser.add_argument("--timeout", type=int, default=600, help="Timeout in seconds")
+    parser.add_argument("--method", choices=["auto", "bnb", "held_karp"], default="auto",
+                        help="auto: Held-Karp when it fits in the memory budget, branch and bound otherwise")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET >> 20,
+                        help="Memory allowed for the Held-Karp tables in MiB (method auto)")
+    parser.add_argument("--bound", choices=["onetree", "mst"], default="onetree",
+                        help="Branch and bound lower bound: 1-tree with subgradient penalties, or MST")
+    parser.add_argument("--workers", type=int, default=1, help="Number of branch and bound processes")
+    parser.add_argument("--warm-start", default="lk",
+                        help=f"Initial incumbent: one of {', '.join(WARM_STARTS)} or a solution file")
+    parser.add_argument("--warm-start-budget", type=float, default=WARM_START_BUDGET,
+                        help="Time budget of the grasp / lk warm starts in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the grasp / lk warm starts")
+    add_profiling_arguments(parser)
     args = parser.parse_args()
 
     try:
-        graph = Graph.load_from_file(args.input_file)
-        solver = TSPSolverExact(graph)
-        best_path, best_cost = solver.solve(timeout=args.timeout)
+        start_time = time.time()
+        profiler = profiler_from_args(args)
+        with profile_phase(profiler, "load"):
+            graph = Graph.load_from_file(args.input_file)
+        if profiler is not None:
+            from src.solvers import instrument_solvers
+            instrument_solvers(profiler, graph)
+        initial_tour = warm_start_tour(graph, args.warm_start, min(args.warm_start_budget, args.timeout), args.seed)
+        solver = TSPSolverExact(graph, initial_tour)
+        # The warm start is part of the time budget
+        remaining = max(0, args.timeout - (time.time() - start_time))
+        best_path, best_cost = solver.solve(timeout=remaining, method=args.method,
+                                            memory_budget=args.memory_budget << 20, bound=args.bound,
+                                            workers=args.workers)
         
         print(f"Optimal Tour: {best_path}")
         print(f"Optimal Cost: {best_cost}")
+        if solver.lower_bound and best_cost > solver.lower_bound:
+            print(f"Lower bound: {solver.lower_bound} (gap {100 * (best_cost - solver.lower_bound) / solver.lower_bound:.2f}%)")
+        if solver.method == "initial":
+            print(f"No search above {MAX_SEARCH_VERTICES} vertices: warm start tour returned")
+        if solver.method == "bnb":
+            print(f"Nodes: {solver.nodes_expanded} expanded, {solver.nodes_pruned} pruned by bound, "
+                  f"{solver.nodes_cut} cut by cost")
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.format_report())
         
         write_solution(args.input_file, "exact", best_path, best_cost)
         
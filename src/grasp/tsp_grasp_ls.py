@@ -1,83 +1,234 @@
 import sys
 import os
-import random
 import time
 import argparse
+import multiprocessing
+
+import numpy as np
 
 # Add src to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.model.graph import Graph
 from src.model.utils import write_solution
-from src.local_search.tsp_local_search import local_search_2opt
+from src.model.profiling import add_profiling_arguments, profiler_from_args, profile_phase
+from src.local_search.tsp_local_search import LOCAL_SEARCHES, check_symmetric
+
+# Tours built per call to the batched construction in grasp_ls
+CONSTRUCTION_BATCH = 8
+
+# Steps timed by construction_time
+CONSTRUCTION_SAMPLE_STEPS = 8
 
-def randomized_nearest_neighbor(graph, alpha=0.1):
+def randomized_nearest_neighbor(graph, alpha=0.1, rng=None, deadline=None):
+    """
+    Greedy randomized construction: from a random start, repeatedly moves to a
+    random node of the Restricted Candidate List (unvisited nodes whose distance
+    is <= min + alpha * (max - min) over the unvisited nodes).
+    rng: numpy Generator (a fresh unseeded one by default).
+    """
+    return randomized_nearest_neighbor_batch(graph, 1, alpha, rng, deadline)[0]
+
+def randomized_nearest_neighbor_batch(graph, count, alpha=0.1, rng=None, deadline=None):
+    """
+    Builds count randomized nearest neighbor tours at once. Each step works on
+    the (count, n) block of rows of the current nodes, with a mask of the
+    unvisited nodes: min/max/threshold, the RCL and the random pick in the RCL
+    are all array operations.
+    deadline: time.time() value past which the other tours are dropped and
+    only the first one is completed (the caller always gets a tour).
+    Returns a list of (path, cost).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
     n = graph.n
-    unvisited = list(range(n))
-    
+    batch = np.arange(count)
+    all_nodes = np.arange(n)[None, :]
+
     # Start at a random node
-    start_node = random.choice(unvisited)
-    unvisited.remove(start_node)
-    
-    current_node = start_node
-    path = [current_node]
-    cost = 0
-
-    dist_fn = graph.get_weight
-
-    while unvisited:
-        # Find distances to all unvisited neighbors
-        candidates = []
-        min_dist = float('inf')
-        max_dist = float('-inf')
-
-        for neighbor in unvisited:
-            dist = dist_fn(current_node, neighbor)
-            candidates.append((neighbor, dist))
-            if dist < min_dist:
-                min_dist = dist
-            if dist > max_dist:
-                max_dist = dist
+    current_nodes = rng.integers(n, size=count)
+    unvisited = np.ones((count, n), dtype=bool)
+    unvisited[batch, current_nodes] = False
+    paths = np.empty((count, n), dtype=np.int64)
+    paths[:, 0] = current_nodes
+
+    for step in range(1, n):
+        if deadline is not None and count > 1 and time.time() > deadline:
+            count, batch = 1, batch[:1]
+            current_nodes, unvisited, paths = current_nodes[:1], unvisited[:1], paths[:1]
+
+        # Distances from each current node, restricted to its unvisited nodes
+        dists = graph.get_weights(current_nodes[:, None], all_nodes)
+        min_dist = np.where(unvisited, dists, np.inf).min(axis=1)
+        max_dist = np.where(unvisited, dists, -np.inf).max(axis=1)
 
         # Restricted Candidate List (RCL)
         threshold = min_dist + alpha * (max_dist - min_dist)
-        rcl = [c for c in candidates if c[1] <= threshold]
-        
-        # Pick random from RCL
-        next_node, dist = random.choice(rcl)
-            
-        path.append(next_node)
-        unvisited.remove(next_node)
-        cost += dist
-        current_node = next_node
+        rcl = unvisited & (dists <= threshold[:, None])
 
-    # Return to start
-    cost += dist_fn(current_node, path[0])
-    
-    return path, cost
+        # Pick random from RCL: the k-th member of each row, k uniform in [0, |RCL|)
+        rcl_rank = np.cumsum(rcl, axis=1)
+        k = (rng.random(count) * rcl_rank[:, -1]).astype(np.int64)
+        next_nodes = np.argmax(rcl_rank > k[:, None], axis=1)
+
+        unvisited[batch, next_nodes] = False
+        paths[:, step] = next_nodes
+        current_nodes = next_nodes
+
+    return [(path, graph.calculate_tour_cost(path)) for path in paths.tolist()]
 
-def grasp_ls(graph, max_iterations=10, alpha=0.2, timeout=600):
+def construction_time(graph, steps=CONSTRUCTION_SAMPLE_STEPS):
+    """
+    Estimated time (seconds) of one randomized_nearest_neighbor tour: the n
+    steps each scan a full row, so a few steps are timed and scaled to n.
+    """
+    n = graph.n
+    steps = max(1, min(steps, n))
+    all_nodes = np.arange(n)[None, :]
+    unvisited = np.ones((1, n), dtype=bool)
+    start = time.perf_counter()
+    for node in range(steps):
+        dists = graph.get_weights(np.array([[node]]), all_nodes)
+        np.where(unvisited, dists, np.inf).min(axis=1)
+        np.where(unvisited, dists, -np.inf).max(axis=1)
+    return (time.perf_counter() - start) / steps * n
+
+def grasp_ls(graph, max_iterations=10, alpha=0.2, timeout=600, neighborhood="2opt",
+             workers=1, seed=None, target_cost=None, trace=None):
+    """
+    GRASP: max_iterations independent (randomized construction + local search)
+    iterations, keeping the best tour. Stops early on timeout or once a tour
+    of cost <= target_cost is found. The timeout also interrupts the running
+    construction (only one tour is completed) and local search, so a run
+    ends at most one tour construction late. With workers > 1 the iterations are
+    spread over a process pool (see _parallel_grasp_ls).
+    trace: optional ConvergenceTrace receiving the improvements and the
+    number of iterations.
+    """
+    check_symmetric(graph)
+    if workers > 1:
+        return _parallel_grasp_ls(graph, max_iterations, alpha, timeout, neighborhood,
+                                  workers, seed, target_cost, trace)
+
+    local_search = LOCAL_SEARCHES[neighborhood]
+    rng = np.random.default_rng(seed)
     best_tour = []
     best_cost = float('inf')
+    # Tours built by the last batched construction, not improved yet
+    pending = []
     
     start_time = time.time()
+    deadline = start_time + timeout
+    iterations = 0
     
     for i in range(max_iterations):
         if time.time() - start_time > timeout:
-            # print(f"Timeout reached at iteration {i}")
+            break
+        if target_cost is not None and best_cost <= target_cost:
             break
             
-        # Phase 1: Constructive
-        candidate_tour, candidate_cost = randomized_nearest_neighbor(graph, alpha)
+        # Phase 1: Constructive (CONSTRUCTION_BATCH tours per call)
+        if not pending:
+            pending = randomized_nearest_neighbor_batch(graph, min(CONSTRUCTION_BATCH, max_iterations - i), alpha, rng,
+                                                        deadline)
+        candidate_tour, candidate_cost = pending.pop()
         
         # Phase 2: Local Search
-        improved_tour, improved_cost = local_search_2opt(graph, candidate_tour)
+        improved_tour, improved_cost = local_search(graph, candidate_tour, deadline=deadline)
+        iterations += 1
         
         if improved_cost < best_cost:
             best_cost = improved_cost
             best_tour = improved_tour
-            # print(f"New best found at iteration {i}: {best_cost}")
-            
+            if trace is not None:
+                trace.record(best_cost)
+
+    if trace is not None:
+        trace.set_counter('iterations', iterations)
+    return best_tour, best_cost
+
+# State of a GRASP worker process, set once by _init_grasp_worker
+_worker = {}
+
+def _init_grasp_worker(spec, worker_counter, shared_best, deadline, alpha, neighborhood, seed, target_cost):
+    graph, shm = Graph.from_shared_memory(spec)
+
+    # Per-worker RNG: seed + worker index when seeded
+    with worker_counter.get_lock():
+        index = worker_counter.value
+        worker_counter.value += 1
+    rng = np.random.default_rng(seed + index if seed is not None else None)
+
+    _worker.update(graph=graph, shm=shm, rng=rng, shared_best=shared_best, deadline=deadline,
+                   alpha=alpha, local_search=LOCAL_SEARCHES[neighborhood], target_cost=target_cost)
+
+def _grasp_worker_iteration(_):
+    """
+    One GRASP iteration in a worker. Returns (tour, cost) when it beats the
+    shared best cost, None otherwise (also when the run is already over).
+    """
+    shared_best = _worker['shared_best']
+    target_cost = _worker['target_cost']
+    if time.time() > _worker['deadline']:
+        return None
+    if target_cost is not None and shared_best.value <= target_cost:
+        return None
+
+    graph = _worker['graph']
+    candidate_tour, _ = randomized_nearest_neighbor(graph, _worker['alpha'], _worker['rng'], _worker['deadline'])
+    improved_tour, improved_cost = _worker['local_search'](graph, candidate_tour, deadline=_worker['deadline'])
+
+    with shared_best.get_lock():
+        if improved_cost >= shared_best.value:
+            return None
+        shared_best.value = improved_cost
+    return improved_tour, improved_cost
+
+def _parallel_grasp_ls(graph, max_iterations, alpha, timeout, neighborhood, workers, seed, target_cost, trace=None):
+    """
+    Runs the GRASP iterations on a pool of worker processes.
+    The weights are placed once in shared memory (no per-task pickling),
+    each worker has its own seeded RNG and the best cost is shared, so
+    workers only send back improving tours and all stop on the target cost.
+    The timeout is enforced both by the workers (no iteration starts after
+    the deadline) and here (the pool is terminated at the deadline).
+    """
+    deadline = time.time() + timeout
+    ctx = multiprocessing.get_context()
+    shared_best = ctx.Value('d', float('inf'))
+    worker_counter = ctx.Value('i', 0)
+
+    best_tour = []
+    best_cost = float('inf')
+    iterations = 0
+
+    shm, spec = graph.to_shared_memory()
+    pool = ctx.Pool(workers, initializer=_init_grasp_worker,
+                    initargs=(spec, worker_counter, shared_best, deadline, alpha, neighborhood, seed, target_cost))
+    try:
+        results = pool.imap_unordered(_grasp_worker_iteration, range(max_iterations))
+        while True:
+            try:
+                result = results.next(timeout=max(0.0, deadline - time.time()))
+            except (StopIteration, multiprocessing.TimeoutError):
+                break
+
+            iterations += 1
+            if result is not None and result[1] < best_cost:
+                best_tour, best_cost = result
+                if trace is not None:
+                    trace.record(best_cost)
+            if target_cost is not None and best_cost <= target_cost:
+                break
+    finally:
+        # Unfinished iterations are abandoned (timeout or target reached)
+        pool.terminate()
+        pool.join()
+        shm.close()
+        shm.unlink()
+
+    if trace is not None:
+        trace.set_counter('iterations', iterations)
     return best_tour, best_cost
 
 def main():
@@ -86,15 +237,31 @@ def main():
     parser.add_argument("--timeout", type=int, default=600, help="Timeout in seconds")
     parser.add_argument("--iterations", type=int, default=10, help="Number of iterations")
     parser.add_argument("--alpha", type=float, default=0.3, help="RCL alpha parameter")
+    parser.add_argument("--neighborhood", choices=sorted(LOCAL_SEARCHES), default="2opt",
+                        help="Local search applied to each constructed tour (see tsp_local_search.py)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes running iterations")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (worker i uses seed + i)")
+    parser.add_argument("--target", type=float, default=None, help="Stop as soon as a tour of cost <= target is found")
+    add_profiling_arguments(parser)
     args = parser.parse_args()
     
     try:
-        graph = Graph.load_from_file(args.input_file)
+        profiler = profiler_from_args(args)
+        with profile_phase(profiler, "load"):
+            graph = Graph.load_from_file(args.input_file)
+        if profiler is not None:
+            from src.solvers import instrument_solvers
+            instrument_solvers(profiler, graph)
         
-        tour, cost = grasp_ls(graph, max_iterations=args.iterations, alpha=args.alpha, timeout=args.timeout)
+        tour, cost = grasp_ls(graph, max_iterations=args.iterations, alpha=args.alpha, timeout=args.timeout,
+                              neighborhood=args.neighborhood, workers=args.workers, seed=args.seed,
+                              target_cost=args.target)
         
         print(f"Tour: {tour}")
         print(f"Cost: {cost}")
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.format_report())
         
         write_solution(args.input_file, "grasp_ls", tour, cost)
         
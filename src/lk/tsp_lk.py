@@ -0,0 +1,236 @@
+import sys
+import os
+import random
+import time
+import argparse
+
+# Add src to python path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.model.graph import Graph, DEFAULT_NEIGHBORS
+from src.model.tour import Tour
+from src.model.utils import write_solution
+from src.model.profiling import add_profiling_arguments, profiler_from_args, profile_phase
+from src.constructive.tsp_constructive import nearest_neighbor, CONSTRUCTIONS
+from src.local_search.tsp_local_search import NeighborListSearch, MIN_OR_OPT_SIZE, local_search_2opt, check_symmetric
+
+# Maximum number of 2-opt moves chained in one Lin-Kernighan move
+MAX_DEPTH = 10
+
+# Number of alternatives tried for the first added edge before giving up on t1
+FIRST_LEVEL_BREADTH = 5
+
+# Longest segment of the double-bridge kicks, keeps the perturbation local
+KICK_SEGMENT = 50
+
+class LinKernighanSearch(NeighborListSearch):
+    """
+    Lin-Kernighan style variable-depth search (LK with 2-opt sub-moves).
+    From t1 and one of its tour neighbors t2, the edge (t1, t2) is removed and
+    a chain of 2-opt moves is built: each step adds (t2, t3), t3 a candidate of
+    t2, removes (t3, t4) and closes the tour with (t4, t1), which is removed
+    again by the next step (t2 <- t4). Every intermediate tour is valid, so the
+    chain is cut after its best closing and the following moves are undone.
+    """
+    def __init__(self, graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS, max_depth=MAX_DEPTH):
+        super().__init__(graph, initial_tour, num_neighbors)
+        self.max_depth = max_depth
+
+    def try_lk(self, t1):
+        tour = self.tour
+        for t2 in (tour.next(t1), tour.prev(t1)):
+            if self._lk_move(t1, t2):
+                return True
+        return False
+
+    def _candidates(self, t1, t2, gain, added, removed):
+        """
+        Possible (t3, t4) for the next step, best first: t3 is a candidate of t2
+        with a positive partial gain, t4 its tour neighbor on the side that
+        keeps the tour a single cycle.
+        """
+        tour, dist = self.tour, self.dist
+        # t4 is taken on the opposite side of the one t2 is on from t1
+        pred = tour.prev if tour.next(t1) == t2 else tour.next
+
+        candidates = []
+        for t3, d_23 in zip(self.neighbor_lists[t2], self.neighbor_weights[t2]):
+            partial = gain - d_23
+            if partial <= 1e-9:
+                break # Sorted lists: every further candidate has a negative partial gain
+            if t3 == t1 or (min(t2, t3), max(t2, t3)) in removed:
+                continue
+            t4 = pred(t3)
+            if t4 == t2 or (min(t3, t4), max(t3, t4)) in added:
+                continue
+            candidates.append((dist(t3, t4) - d_23, t3, t4))
+
+        candidates.sort(reverse=True)
+        return [(t3, t4) for _, t3, t4 in candidates]
+
+    def _lk_move(self, t1, t2):
+        """Tries the chains starting by removing (t1, t2). Applies the best improving one, if any."""
+        tour, dist = self.tour, self.dist
+        first_choices = self._candidates(t1, t2, dist(t1, t2), set(), {(min(t1, t2), max(t1, t2))})
+
+        for first in first_choices[:FIRST_LEVEL_BREADTH]:
+            head = t2
+            gain = dist(t1, head)
+            added = set()
+            removed = {(min(t1, head), max(t1, head))}
+            moves = []
+            best_gain, best_length = 1e-9, 0
+
+            choice = first
+            while choice is not None and len(moves) < self.max_depth:
+                t3, t4 = choice
+                gain += dist(t3, t4) - dist(head, t3)
+                # Remove (t1, head), (t4, t3), add (t1, t4), (head, t3)
+                tour.two_opt_move(t1, head, t4, t3)
+                moves.append((t1, head, t4, t3))
+                added.add((min(head, t3), max(head, t3)))
+                removed.add((min(t3, t4), max(t3, t4)))
+
+                closed_gain = gain - dist(t4, t1)
+                if closed_gain > best_gain:
+                    best_gain, best_length = closed_gain, len(moves)
+
+                head = t4
+                next_choices = self._candidates(t1, head, gain, added, removed)
+                choice = next_choices[0] if next_choices else None
+
+            # Keep the chain up to its best closing, undo the rest
+            for a, b, c, d in reversed(moves[best_length:]):
+                tour.two_opt_move(a, c, b, d)
+
+            if best_length:
+                for a, b, c, d in moves[:best_length]:
+                    self.activate(a, b, c, d)
+                return True
+
+        return False
+
+def double_bridge(tour, rng):
+    """
+    Double-bridge kick A B C D -> A C B D on three consecutive short segments
+    (at most KICK_SEGMENT cities each) starting at a random position.
+    A move that 2-opt and LK cannot undo easily.
+    """
+    n = len(tour)
+    start = rng.randrange(n)
+    rotated = tour[start:] + tour[:start]
+    max_length = max(1, min(KICK_SEGMENT, (n - 1) // 3))
+    i = 1 + rng.randrange(max_length)
+    j = i + 1 + rng.randrange(max_length)
+    k = j + 1 + rng.randrange(max_length)
+    return rotated[:i] + rotated[j:k] + rotated[i:j] + rotated[k:]
+
+def lin_kernighan(graph, initial_tour=None, timeout=600, max_kicks=None, seed=None,
+                  num_neighbors=DEFAULT_NEIGHBORS, max_depth=MAX_DEPTH, trace=None):
+    """
+    Iterated Lin-Kernighan: LK moves and Or-opt moves until a local optimum
+    is reached, then double-bridge kicks followed by a new descent, keeping
+    the kicked tour only when it is better. Stops after max_kicks kicks
+    (default: n) or when the timeout is reached, also during a descent.
+    Starts from initial_tour, or from the nearest neighbor tour.
+    trace: optional ConvergenceTrace receiving the improvements and the
+    number of kicks.
+    """
+    check_symmetric(graph)
+    start_time = time.time()
+    deadline = start_time + timeout
+    rng = random.Random(seed)
+
+    if initial_tour is None:
+        initial_tour, _ = nearest_neighbor(graph)
+    if len(initial_tour) < MIN_OR_OPT_SIZE:
+        best_tour, best_cost = local_search_2opt(graph, initial_tour)
+        if trace is not None:
+            trace.record(best_cost)
+        return best_tour, best_cost
+    if max_kicks is None:
+        max_kicks = graph.n
+
+    search = LinKernighanSearch(graph, initial_tour, num_neighbors, max_depth)
+    operators = (search.try_lk, search.try_oropt)
+    # The first descent is the longest part on large instances: it stops at the timeout too
+    search.run(operators, deadline)
+    best_tour = search.tour.to_list()
+    best_cost = graph.calculate_tour_cost(best_tour)
+    if trace is not None:
+        trace.record(best_cost)
+
+    kicks = 0
+    for _ in range(max_kicks):
+        if time.time() - start_time > timeout:
+            break
+        kicks += 1
+
+        kicked = double_bridge(best_tour, rng)
+        search.tour = Tour(kicked)
+        # Only the cities around the kick can start an improving move
+        search.activate(*_kick_endpoints(best_tour, kicked))
+        search.run(operators, deadline)
+
+        candidate_tour = search.tour.to_list()
+        candidate_cost = graph.calculate_tour_cost(candidate_tour)
+        if candidate_cost < best_cost:
+            best_tour, best_cost = candidate_tour, candidate_cost
+            if trace is not None:
+                trace.record(best_cost)
+
+    if trace is not None:
+        trace.set_counter('kicks', kicks)
+    return best_tour, best_cost
+
+def _kick_endpoints(tour, kicked):
+    """Cities whose tour neighbors differ between tour and kicked (the endpoints of the changed edges)."""
+    n = len(tour)
+    succ = [0] * n
+    for i, city in enumerate(tour):
+        succ[city] = tour[(i + 1) % n]
+    changed = []
+    for i, city in enumerate(kicked):
+        nxt = kicked[(i + 1) % n]
+        if succ[city] != nxt and succ[nxt] != city:
+            changed.extend((city, nxt))
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description="Lin-Kernighan TSP Solver")
+    parser.add_argument("input_file", help="Path to the input file")
+    parser.add_argument("--timeout", type=int, default=600, help="Timeout in seconds")
+    parser.add_argument("--kicks", type=int, default=None, help="Number of double-bridge kicks (default: n)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed of the kicks")
+    parser.add_argument("--init", choices=list(CONSTRUCTIONS), default="nn",
+                        help="Initial tour construction (see tsp_constructive.py)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        profiler = profiler_from_args(args)
+        with profile_phase(profiler, "load"):
+            graph = Graph.load_from_file(args.input_file)
+        if profiler is not None:
+            from src.solvers import instrument_solvers
+            instrument_solvers(profiler, graph)
+
+        initial_tour, _ = CONSTRUCTIONS[args.init](graph)
+        tour, cost = lin_kernighan(graph, initial_tour, timeout=args.timeout, max_kicks=args.kicks, seed=args.seed)
+
+        print(f"Tour: {tour}")
+        print(f"Cost: {cost}")
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.format_report())
+
+        write_solution(args.input_file, "lk", tour, cost)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,363 @@
 import sys
 import os
+import time
+import argparse
+from collections import deque
+
+import numpy as np
 
 # Add src to python path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.model.graph import Graph
+from src.model.graph import Graph, DEFAULT_NEIGHBORS
+from src.model.tour import Tour
 from src.model.utils import write_solution
-from src.constructive.tsp_constructive import nearest_neighbor
+from src.model.profiling import add_profiling_arguments, profiler_from_args, profile_phase
+from src.constructive.tsp_constructive import CONSTRUCTIONS
+
+# Longest segment relocated by Or-opt
+MAX_OR_SEGMENT = 3
+
+# Active cities processed between two deadline checks of NeighborListSearch.run
+DEADLINE_CHECK_INTERVAL = 256
+
+# Below this size Or-opt segments overlap their own neighborhood: use the full 2-opt scan
+MIN_OR_OPT_SIZE = 8
 
-def local_search_2opt(graph, initial_tour):
+def check_symmetric(graph):
+    """
+    The move deltas of the local searches assume w(i, j) == w(j, i): on an
+    asymmetric instance they are wrong and a descent may never end.
+    Raises ValueError for such graphs.
+    """
+    if not graph.is_symmetric():
+        raise ValueError("Asymmetric instance: the local searches need symmetric weights "
+                         "(use the constructive or exact solvers)")
+
+def _improving_2opt_moves(graph, best_tour, successors, edge_cost, i):
+    """
+    Deltas of the 2-opt moves of local_search_2opt removing edge (i-1, i),
+    for every j > i, and the positions of the improving ones.
+    """
+    n = len(best_tour)
+    # We pick edges (i-1, i) and (j, j_next) for every j > i
+    # And try to replace them with (i-1, j) and (i, j_next)
+    # Note: this reverse the segment tour[i...j]
+    # Non-adjacent edges requirement: skip j_next == i - 1
+    last_j = n - 1 if i == 1 else n
+    tour_j = best_tour[i + 1:last_j]
+    tour_j_next = successors[i + 1:last_j]
+
+    # delta = cost_new - cost_old
+    delta = graph.get_weights(best_tour[i - 1], tour_j) + graph.get_weights(best_tour[i], tour_j_next) \
+          - edge_cost[i - 1] - edge_cost[i + 1:last_j]
+    return delta, np.flatnonzero(delta < -1e-9)
+
+def local_search_2opt(graph, initial_tour, deadline=None):
     """
     Optimized 2-opt local search that uses incremental cost calculation.
+    The inner loop over j is evaluated as one array operation.
     Complexity: O(n^2) per restart.
+    Stops early at deadline (a time.time() value), like every local search
+    of LOCAL_SEARCHES.
     """
-    best_tour = list(initial_tour)
-    n = len(best_tour)
+    check_symmetric(graph)
+    tour = Tour(initial_tour)
+    best_tour = tour.as_array()
+    n = len(tour)
     current_cost = graph.calculate_tour_cost(best_tour)
     improved = True
-    
-    dist = graph.get_weight
-    
+
     while improved:
         improved = False
+        # edge_cost[k] = dist(tour[k], tour[k+1])
+        successors = np.roll(best_tour, -1)
+        edge_cost = graph.get_weights(best_tour, successors)
+
         for i in range(1, n - 1):
-            for j in range(i + 1, n):
-                # We pick edges (i-1, i) and (j, j_next)
-                # And try to replace them with (i-1, j) and (i, j_next)
-                # Note: this reverse the segment tour[i...j]
-                
-                j_next = (j + 1) % n
-                
-                # Non-adjacent edges requirement
-                if j_next == i - 1:
+            if deadline is not None and time.time() > deadline:
+                return tour.to_list(), current_cost
+            delta, improving = _improving_2opt_moves(graph, best_tour, successors, edge_cost, i)
+            if improving.size:
+                # First improvement strategy
+                k = improving[0]
+                j = i + 1 + k
+                # Apply swap (reverse segment, or its shorter complement)
+                tour.reverse(int(best_tour[i]), int(best_tour[j]))
+                current_cost += delta[k].item()
+                improved = True
+                break
+
+    return tour.to_list(), current_cost
+
+class NeighborListSearch:
+    """
+    State shared by the neighbor-list move operators: the tour, the candidate
+    lists and the queue of "active" cities (don't-look bits).
+    An operator takes an active city a, looks for an improving move involving
+    a, applies it and reactivates the touched cities; it returns whether a move
+    was applied. A city for which no operator finds a move is dropped from the
+    queue until a later move touches it again.
+    """
+    def __init__(self, graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS):
+        check_symmetric(graph)
+        n = len(initial_tour)
+        self.tour = Tour(initial_tour)
+        self.dist = graph.get_weight
+
+        neighbor_lists = graph.neighbors(num_neighbors)
+        # dist(a, c) for every candidate c of a, read as plain lists in the hot loop
+        self.neighbor_weights = graph.get_weights(np.arange(n)[:, None], neighbor_lists).tolist()
+        self.neighbor_lists = neighbor_lists.tolist()
+
+        self.queue = deque()
+        self.queued = [False] * n
+        self.activate(*initial_tour)
+        # Move deltas evaluated by the operators during the last run (profiling counters)
+        self.two_opt_deltas = 0
+        self.or_opt_deltas = 0
+
+    def activate(self, *cities):
+        queued = self.queued
+        for city in cities:
+            if not queued[city]:
+                queued[city] = True
+                self.queue.append(city)
+
+    def run(self, operators, deadline=None):
+        """
+        Applies the operators until no active city is left, or until deadline
+        (a time.time() value, checked every DEADLINE_CHECK_INTERVAL cities):
+        the tour is then left as it is, a valid tour, with the remaining
+        cities still active. Returns the number of moves applied.
+        """
+        moves = 0
+        self.two_opt_deltas = self.or_opt_deltas = 0
+        queue, queued = self.queue, self.queued
+        checks_left = DEADLINE_CHECK_INTERVAL
+        while queue:
+            if deadline is not None:
+                checks_left -= 1
+                if checks_left <= 0:
+                    checks_left = DEADLINE_CHECK_INTERVAL
+                    if time.time() > deadline:
+                        break
+            a = queue.popleft()
+            queued[a] = False
+
+            improved = True
+            while improved:
+                improved = False
+                for operator in operators:
+                    if operator(a):
+                        moves += 1
+                        improved = True
+                        break
+        return moves
+
+    def try_2opt(self, a):
+        """2-opt: replace (a, b), (c, d) with (a, c), (b, d), c a candidate of a."""
+        tour, dist = self.tour, self.dist
+        evaluated = 0
+        for succ in (tour.next, tour.prev):
+            # Tour edge (a, b) to remove: b is the successor or the predecessor of a
+            b = succ(a)
+            d_ab = dist(a, b)
+
+            for c, d_ac in zip(self.neighbor_lists[a], self.neighbor_weights[a]):
+                if d_ac >= d_ab:
+                    break # Sorted lists: no further candidate can improve
+
+                d = succ(c)
+                if c == b or d == a:
                     continue
-                    
-                # delta = cost_new - cost_old
-                delta = dist(best_tour[i-1], best_tour[j]) + dist(best_tour[i], best_tour[j_next]) \
-                      - dist(best_tour[i-1], best_tour[i]) - dist(best_tour[j], best_tour[j_next])
-                
+
+                evaluated += 1
+                delta = d_ac + dist(b, d) - d_ab - dist(c, d)
                 if delta < -1e-9:
-                    # Apply swap (reverse segment)
-                    best_tour[i:j+1] = best_tour[i:j+1][::-1]
-                    current_cost += delta
-                    improved = True
-                    break # First improvement strategy
-            if improved:
-                break
-                
-    return best_tour, current_cost
+                    tour.two_opt_move(a, b, c, d)
+                    self.activate(a, b, c, d)
+                    self.two_opt_deltas += evaluated
+                    return True
+        self.two_opt_deltas += evaluated
+        return False
+
+    def try_oropt(self, a):
+        """
+        Or-opt: move a segment of 1 to MAX_OR_SEGMENT cities having a as one end
+        next to a candidate c of a, the segment being reversed or not.
+        Removing the segment u..v from p u..v nx gains
+        g = dist(p, u) + dist(v, nx) - dist(p, nx), and inserting it in the edge
+        (c, c2) costs dist(a, c) + dist(f, c2) - dist(c, c2), f the other end.
+        """
+        tour, dist = self.tour, self.dist
+        evaluated = 0
+        for length in range(1, MAX_OR_SEGMENT + 1):
+            for a_is_first in (True, False):
+                # Segment u..v in tour order, with a = u or a = v
+                segment = [a]
+                for _ in range(length - 1):
+                    segment.append(tour.next(segment[-1]) if a_is_first else tour.prev(segment[-1]))
+                u, v = (a, segment[-1]) if a_is_first else (segment[-1], a)
+                f = segment[-1]
+                p, nx = tour.prev(u), tour.next(v)
+                if p == nx or p in segment or nx in segment:
+                    continue
+
+                gain = dist(p, u) + dist(v, nx) - dist(p, nx)
+                if gain <= 1e-9:
+                    continue
+
+                for c, d_ac in zip(self.neighbor_lists[a], self.neighbor_weights[a]):
+                    if d_ac >= gain:
+                        break # The insertion costs at least dist(a, c)
+                    if c in segment:
+                        continue
+
+                    for c2 in (tour.next(c), tour.prev(c)):
+                        if c2 in segment:
+                            continue
+                        evaluated += 1
+                        delta = d_ac + dist(f, c2) - dist(c, c2) - gain
+                        if delta < -1e-9:
+                            self._apply_oropt(p, u, v, nx, c, c2, a)
+                            self.activate(p, nx, u, v, c, c2)
+                            self.or_opt_deltas += evaluated
+                            return True
+        self.or_opt_deltas += evaluated
+        return False
+
+    def _apply_oropt(self, p, u, v, nx, c, c2, a):
+        """
+        Moves the segment p [u..v] nx into the edge (c, c2) so that a ends up
+        next to c, as a sequence of 2-opt moves (reversals).
+        """
+        tour = self.tour
+        # Insertion edge (x, y) in tour order
+        x, y = (c, c2) if tour.next(c) == c2 else (c2, c)
+        # Reconnect as x v..u y (segment reversed)...
+        tour.two_opt_move(p, u, x, y)   # p u..v nx..x y -> p x..nx v..u y
+        tour.two_opt_move(p, x, nx, v)  # p x..nx v..u y -> p nx..x v..u y
+        # ...then flip the segment back if a must be next to c the other way round
+        if (a == u) == (x == c):
+            tour.two_opt_move(x, v, u, y)  # x v..u y -> x u..v y
+
+def local_search_2opt_dlb(graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS, deadline=None):
+    """
+    2-opt local search driven by neighbor lists and don't-look bits.
+    A queue holds the "active" cities. For an active city a, only the moves
+    adding an edge (a, c) with c among the num_neighbors nearest neighbors of a
+    are tried, and only while dist(a, c) < dist(a, succ/pred(a)) (otherwise
+    the move cannot improve). An applied move reactivates its 4 endpoints;
+    a city without improving move is dropped from the queue (don't-look bit set).
+    Same (tour, cost) contract as local_search_2opt.
+    """
+    if len(initial_tour) < 5:
+        # No room for neighbor-restricted moves, the full scan is instant anyway
+        return local_search_2opt(graph, initial_tour, deadline)
+
+    search = NeighborListSearch(graph, initial_tour, num_neighbors)
+    search.run((search.try_2opt,), deadline)
+
+    best_tour = search.tour.to_list()
+    return best_tour, graph.calculate_tour_cost(best_tour)
+
+def local_search_oropt(graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS, deadline=None):
+    """
+    Or-opt local search: relocates segments of 1 to MAX_OR_SEGMENT cities,
+    possibly reversed, with the same neighbor lists and don't-look bits as
+    local_search_2opt_dlb.
+    """
+    if len(initial_tour) < MIN_OR_OPT_SIZE:
+        return local_search_2opt(graph, initial_tour, deadline)
+
+    search = NeighborListSearch(graph, initial_tour, num_neighbors)
+    search.run((search.try_oropt,), deadline)
+
+    best_tour = search.tour.to_list()
+    return best_tour, graph.calculate_tour_cost(best_tour)
+
+def local_search_or2opt(graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS, deadline=None):
+    """
+    Or-2opt: 2-opt and Or-opt moves (a restricted 3-opt) explored together,
+    each active city trying 2-opt first, then Or-opt.
+    """
+    if len(initial_tour) < MIN_OR_OPT_SIZE:
+        return local_search_2opt(graph, initial_tour, deadline)
+
+    search = NeighborListSearch(graph, initial_tour, num_neighbors)
+    search.run((search.try_2opt, search.try_oropt), deadline)
+
+    best_tour = search.tour.to_list()
+    return best_tour, graph.calculate_tour_cost(best_tour)
+
+def variable_neighborhood_descent(graph, initial_tour, num_neighbors=DEFAULT_NEIGHBORS, deadline=None):
+    """
+    Variable Neighborhood Descent: descends with 2-opt until it is stuck, then
+    with Or-opt; whenever Or-opt improves the tour, goes back to 2-opt.
+    Stops when the tour is a local optimum for both neighborhoods.
+    """
+    if len(initial_tour) < MIN_OR_OPT_SIZE:
+        return local_search_2opt(graph, initial_tour, deadline)
+
+    search = NeighborListSearch(graph, initial_tour, num_neighbors)
+    neighborhoods = (search.try_2opt, search.try_oropt)
+    all_cities = list(initial_tour)
+
+    k = 0
+    while k < len(neighborhoods):
+        if deadline is not None and time.time() > deadline:
+            break
+        if search.run((neighborhoods[k],), deadline) and k > 0:
+            k = 0
+        else:
+            k += 1
+        # Every city is active again for the next neighborhood
+        search.activate(*all_cities)
+
+    best_tour = search.tour.to_list()
+    return best_tour, graph.calculate_tour_cost(best_tour)
+
+# Local searches selectable by name (CLI --neighborhood, grasp_ls)
+LOCAL_SEARCHES = {
+    "2opt": local_search_2opt_dlb,
+    "2opt-full": local_search_2opt,
+    "oropt": local_search_oropt,
+    "or2opt": local_search_or2opt,
+    "vnd": variable_neighborhood_descent,
+}
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python src/local_search/tsp_local_search.py <input_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Local Search TSP Solver")
+    parser.add_argument("input_file", help="Path to the input file")
+    parser.add_argument("--neighborhood", choices=sorted(LOCAL_SEARCHES), default="2opt",
+                        help="Improvement operator(s): 2opt (neighbor lists), 2opt-full (exhaustive scan), "
+                             "oropt, or2opt (2-opt + Or-opt) or vnd (variable neighborhood descent)")
+    parser.add_argument("--init", choices=list(CONSTRUCTIONS), default="multi_nn",
+                        help="Initial tour construction (see tsp_constructive.py)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
 
-    input_filepath = sys.argv[1]
+    input_filepath = args.input_file
     try:
-        graph = Graph.load_from_file(input_filepath)
+        profiler = profiler_from_args(args)
+        with profile_phase(profiler, "load"):
+            graph = Graph.load_from_file(input_filepath)
+        if profiler is not None:
+            from src.solvers import instrument_solvers
+            instrument_solvers(profiler, graph)
         
-        # Initial solution using Nearest Neighbor
-        initial_tour, initial_cost = nearest_neighbor(graph)
+        # Initial solution (multi-start nearest neighbor by default)
+        initial_tour, initial_cost = CONSTRUCTIONS[args.init](graph)
         # print(f"Initial Cost: {initial_cost}")
         
-        best_tour, best_cost = local_search_2opt(graph, initial_tour)
+        best_tour, best_cost = LOCAL_SEARCHES[args.neighborhood](graph, initial_tour)
         
         print(f"Tour: {best_tour}")
         print(f"Cost: {best_cost}")
+        if profiler is not None:
+            profiler.stop()
+            print(profiler.format_report())
         
         write_solution(input_filepath, "local_search", best_tour, best_cost)
         
@@ -0,0 +1,224 @@
+import math
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.model.graph import Graph, k_smallest_per_row
+
+# Extension of the coordinate instance files (see CoordinateGraph.load_from_file)
+COORDINATE_EXTENSION = '.xy'
+
+# Weight of an edge from the Euclidean distance d of its end points:
+# name -> (function on an array of distances, function on a Python float)
+METRICS = {
+    # Exact distance (float weights)
+    'euclidean': (lambda d: d, lambda d: d),
+    # Distance rounded to the nearest integer (TSPLIB EUC_2D)
+    'euc_2d': (lambda d: np.floor(d + 0.5).astype(np.int64), lambda d: int(d + 0.5)),
+    # Distance rounded up (TSPLIB CEIL_2D)
+    'ceil_2d': (lambda d: np.ceil(d).astype(np.int64), lambda d: int(math.ceil(d)))
+}
+
+DEFAULT_METRIC = 'euc_2d'
+
+# Rows kept by the row() cache (a row holds n weights)
+ROW_CACHE_SIZE = 64
+
+# Average number of points per cell of the neighbor search grid
+POINTS_PER_CELL = 8
+
+# Weights computed at once when searching neighbor lists (bounds temporary memory)
+NEIGHBOR_BLOCK_ELEMENTS = 1 << 22
+
+class CoordinateGraph(Graph):
+    """
+    Complete graph on points of the plane, with weights computed on demand
+    from the coordinates instead of stored: O(n) memory and loading time
+    instead of the O(n^2) matrix of Graph, for instances of tens of
+    thousands of cities.
+    Same accessors as Graph (get_weight, get_weights, row, neighbors,
+    calculate_tour_cost...), returning the same values as a Graph built on
+    the full matrix of the metric, so every solver works unchanged. Rows are
+    computed when requested and the last ROW_CACHE_SIZE ones kept (LRU);
+    neighbor lists come from a grid of the points in O(n log n).
+    """
+    def __init__(self, coordinates, metric=DEFAULT_METRIC):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric} (expected one of {', '.join(METRICS)})")
+        coordinates = np.ascontiguousarray(coordinates, dtype=np.float64)
+        if coordinates.ndim != 2 or coordinates.shape[1] != 2:
+            raise ValueError(f"Expected an (n, 2) array of coordinates, got shape {coordinates.shape}")
+        self.n = len(coordinates)
+        self.coordinates = coordinates
+        self.metric = metric
+        self._weights_of, self._weight_of = METRICS[metric]
+        # Python floats for the scalar accessor (faster than NumPy scalars)
+        self._xs = coordinates[:, 0].tolist()
+        self._ys = coordinates[:, 1].tolist()
+        self._row_cache = OrderedDict()
+        # k -> (n, k) array of nearest neighbors, shared by every solver using this graph
+        self._neighbor_cache = {}
+
+    @staticmethod
+    def load_from_file(filepath, metric=None):
+        """
+        Loads points from a file with the format:
+        n [metric]
+        x_1 y_1
+        ...
+        x_n y_n
+
+        metric (one of METRICS, DEFAULT_METRIC when absent) can also be given
+        as argument, which takes precedence over the file.
+        """
+        with open(filepath, 'r') as f:
+            header = f.readline().split()
+            try:
+                n = int(header[0])
+            except (IndexError, ValueError):
+                raise ValueError("First line must be the number of vertices (integer), optionally followed by the metric.")
+            if metric is None:
+                metric = header[1].lower() if len(header) > 1 else DEFAULT_METRIC
+
+            try:
+                coordinates = np.loadtxt(f, dtype=np.float64, max_rows=n, ndmin=2)
+            except ValueError as e:
+                raise ValueError(f"Malformed coordinates: {e}")
+
+        if coordinates.shape[0] < n:
+            raise ValueError(f"Expected {n} points, found fewer.")
+        if coordinates.shape[1] != 2:
+            raise ValueError(f"Points have {coordinates.shape[1]} coordinates, expected 2.")
+
+        return CoordinateGraph(coordinates, metric)
+
+    def copy(self):
+        """New graph on the same coordinates, without the cached rows and neighbor lists."""
+        return CoordinateGraph(self.coordinates, self.metric)
+
+    def stored_weights(self):
+        return self.coordinates
+
+    def to_shared_memory(self):
+        """Shares the coordinates (see Graph.to_shared_memory)."""
+        shm = shared_memory.SharedMemory(create=True, size=max(1, self.coordinates.nbytes))
+        np.ndarray(self.coordinates.shape, dtype=np.float64, buffer=shm.buf)[...] = self.coordinates
+        spec = {'kind': 'coordinates', 'name': shm.name, 'n': self.n, 'shape': self.coordinates.shape, 'metric': self.metric}
+        return shm, spec
+
+    @staticmethod
+    def _attach_shared_memory(spec):
+        """Graph.from_shared_memory of a block created by CoordinateGraph.to_shared_memory."""
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        coordinates = np.ndarray(spec['shape'], dtype=np.float64, buffer=shm.buf)
+        return CoordinateGraph(coordinates, spec['metric']), shm
+
+    def get_weight(self, i, j):
+        """Returns the weight of edge (i, j) as a Python scalar. 0-indexed internally."""
+        dx = self._xs[i] - self._xs[j]
+        dy = self._ys[i] - self._ys[j]
+        return self._weight_of(math.sqrt(dx * dx + dy * dy))
+
+    def is_integral(self):
+        """True for the rounded metrics."""
+        return self.metric != 'euclidean'
+
+    def is_symmetric(self):
+        return True
+
+    def row(self, i):
+        """Returns the weights of all edges leaving i (read-only, cached)."""
+        weights = self._row_cache.get(i)
+        if weights is not None:
+            self._row_cache.move_to_end(i)
+            return weights
+
+        weights = self.get_weights(i, np.arange(self.n))
+        weights.setflags(write=False)
+        self._row_cache[i] = weights
+        if len(self._row_cache) > ROW_CACHE_SIZE:
+            self._row_cache.popitem(last=False)
+        return weights
+
+    def get_weights(self, us, vs):
+        """
+        Computes the weights of a batch of edges (us[k], vs[k]).
+        Follows NumPy broadcasting, like Graph.get_weights.
+        """
+        a = self.coordinates[np.asarray(us)]
+        b = self.coordinates[np.asarray(vs)]
+        dx = a[..., 0] - b[..., 0]
+        dy = a[..., 1] - b[..., 1]
+        return self._weights_of(np.sqrt(dx * dx + dy * dy))
+
+    def _compute_neighbors(self, k):
+        """
+        Same lists as Graph._compute_neighbors, without the full matrix: the
+        points are bucketed in a grid, and the candidates of a cell are the
+        points of the (2r + 1) x (2r + 1) cells around it. Any other point is
+        at distance >= r * cell size, so the lists are final once the k-th
+        candidate weight is below the weight of that distance; r grows for
+        the points where it is not.
+        """
+        n = self.n
+        neighbor_lists = np.empty((n, k), dtype=np.int32)
+        if k == 0:
+            return neighbor_lists
+
+        low = self.coordinates.min(axis=0)
+        extent = self.coordinates.max(axis=0) - low
+        side = max(1, int(math.sqrt(n / POINTS_PER_CELL)))
+        cell_size = max(extent.max() / side, 1e-12)
+        grid = np.minimum(((self.coordinates - low) / cell_size).astype(np.int64), side - 1)
+        cell_ids = grid[:, 1] * side + grid[:, 0]
+
+        # Points sorted by cell: the points of cell c are order[starts[c]:starts[c + 1]]
+        order = np.argsort(cell_ids, kind='stable')
+        starts = np.searchsorted(cell_ids[order], np.arange(side * side + 1))
+
+        for cell in np.unique(cell_ids).tolist():
+            cx, cy = cell % side, cell // side
+            points = order[starts[cell]:starts[cell + 1]]
+            radius = 1
+            while len(points):
+                x0, x1 = max(0, cx - radius), min(side - 1, cx + radius)
+                y0, y1 = max(0, cy - radius), min(side - 1, cy + radius)
+                candidates = np.concatenate([order[starts[y * side + x0]:starts[y * side + x1 + 1]]
+                                             for y in range(y0, y1 + 1)])
+                covers_all = x0 == 0 and y0 == 0 and x1 == side - 1 and y1 == side - 1
+                if len(candidates) - 1 < k and not covers_all:
+                    radius += 1
+                    continue
+
+                nearest, kth_weights = self._nearest_among(points, candidates, k)
+                if covers_all:
+                    done = np.ones(len(points), dtype=bool)
+                else:
+                    # Slightly shorter distance: safe against the rounding of the grid coordinates
+                    outside = self._weights_of(np.float64(radius * cell_size * (1 - 1e-9)))
+                    done = kth_weights < outside
+                neighbor_lists[points[done]] = nearest[done]
+                points = points[~done]
+                radius += 1
+
+        return neighbor_lists
+
+    def _nearest_among(self, points, candidates, k):
+        """
+        The k nearest candidates of each point, sorted by (weight, index),
+        and the weight of the k-th one (see k_smallest_per_row). Points processed by chunks, so the
+        temporary weights stay under NEIGHBOR_BLOCK_ELEMENTS even for dense
+        clusters of points in a few cells.
+        """
+        nearest = np.empty((len(points), k), dtype=np.int64)
+        kth_weights = np.empty(len(points))
+        chunk = max(1, NEIGHBOR_BLOCK_ELEMENTS // len(candidates))
+        for start in range(0, len(points), chunk):
+            rows = points[start:start + chunk]
+            block = self.get_weights(rows[:, None], candidates[None, :]).astype(np.float64)
+            # A vertex is not its own neighbor
+            block[rows[:, None] == candidates[None, :]] = np.inf
+
+            nearest[start:start + chunk], kth_weights[start:start + chunk] = k_smallest_per_row(block, candidates, k)
+        return nearest, kth_weights
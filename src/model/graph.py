@@ -1,64 +1,321 @@
 import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Directory (next to the instance files) holding the binary matrix caches
+CACHE_DIRNAME = '.tsp_cache'
+
+# Default size of the candidate (nearest neighbor) lists used by the heuristics
+DEFAULT_NEIGHBORS = 20
+
+# Rows processed at once when building neighbor lists (bounds temporary memory)
+NEIGHBOR_BLOCK_ROWS = 1024
+
+# Integer dtypes tried for the stored weights, narrowest first
+WEIGHT_INT_DTYPES = [np.int16, np.int32, np.int64]
+
+# Smallest full matrix (bytes, in its narrow dtype) replaced by the packed
+# triangle (PackedGraph) when symmetric: smaller matrices fit in the CPU caches
+# anyway, and their plain indexing is faster
+PACKED_MIN_BYTES = 16 << 20
+
+def k_smallest_per_row(block, labels, k):
+    """
+    The k smallest weights of every row of block, column j standing for
+    vertex labels[j]: returns their vertices sorted by (weight, vertex), and
+    the k-th weight of every row.
+    argpartition keeps an arbitrary subset of the weights tied with the k-th
+    one, so the rows with such ties are redone over all their tied entries:
+    the result only depends on the weights.
+    """
+    partition = np.argpartition(block, k - 1, axis=1)[:, :k]
+    weights = np.take_along_axis(block, partition, axis=1)
+    vertices = labels[partition]
+    kth_weights = weights.max(axis=1)
+
+    within = block <= kth_weights[:, None]
+    for row in np.flatnonzero(within.sum(axis=1) > k).tolist():
+        entries = np.flatnonzero(within[row])
+        kept = entries[np.lexsort((labels[entries], block[row, entries]))[:k]]
+        vertices[row] = labels[kept]
+        weights[row] = block[row, kept]
+
+    order = np.lexsort((vertices, weights), axis=1)
+    return np.take_along_axis(vertices, order, axis=1), kth_weights
 
 class Graph:
     def __init__(self, n, adjacency_matrix):
         self.n = n
-        self.adjacency_matrix = adjacency_matrix
+        self.adjacency_matrix = self._as_weight_array(adjacency_matrix)
+        # k -> (n, k) array of nearest neighbors, shared by every solver using this graph
+        self._neighbor_cache = {}
+        # Result of is_symmetric, computed on first use
+        self._symmetric = None
+
+    @staticmethod
+    def _as_weight_array(adjacency_matrix):
+        """
+        Converts the weights to a contiguous NumPy array.
+        Integer dtype when every weight is integral (the usual case for TSP
+        instances), float otherwise. Integers are stored in the narrowest of
+        WEIGHT_INT_DTYPES holding them (int16 for most instances: 4x less
+        memory than int64); the accessors return them as int64.
+        """
+        matrix = np.asarray(adjacency_matrix)
+        if matrix.dtype.kind == 'f' and np.all(np.isfinite(matrix)) and np.all(matrix == np.floor(matrix)):
+            matrix = matrix.astype(np.int64)
+        elif matrix.dtype.kind not in 'fi':
+            matrix = matrix.astype(np.float64)
+        if matrix.dtype.kind == 'i' and matrix.size:
+            low, high = matrix.min(), matrix.max()
+            for dtype in WEIGHT_INT_DTYPES:
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    matrix = matrix.astype(dtype, copy=False)
+                    break
+        return np.ascontiguousarray(matrix)
+
+    @staticmethod
+    def from_matrix(adjacency_matrix):
+        """
+        Graph on a square weight matrix, in the most compact representation:
+        PackedGraph (upper triangle only) when the matrix is symmetric and
+        takes at least PACKED_MIN_BYTES, Graph otherwise (asymmetric
+        instances keep the full matrix).
+        """
+        matrix = Graph._as_weight_array(adjacency_matrix)
+        n = matrix.shape[0]
+        if matrix.nbytes >= PACKED_MIN_BYTES and Graph._is_symmetric(matrix):
+            from src.model.packed_graph import PackedGraph
+            return PackedGraph.from_matrix(matrix)
+        return Graph(n, matrix)
+
+    @staticmethod
+    def _is_symmetric(matrix):
+        """Symmetry check by blocks of rows (bounded temporary memory)."""
+        for start in range(0, matrix.shape[0], NEIGHBOR_BLOCK_ROWS):
+            stop = start + NEIGHBOR_BLOCK_ROWS
+            if not np.array_equal(matrix[start:stop], matrix[:, start:stop].T):
+                return False
+        return True
 
     @staticmethod
-    def load_from_file(filepath):
+    def load_from_file(filepath, use_cache=True):
         """
         Loads a graph from a file with the specified format:
         n
         row_1
         ...
         row_n
+
+        The parsed matrix is saved in a binary sidecar cache (see _cache_path).
+        Later loads of the unchanged file open the cache memory-mapped instead
+        of parsing the text again, so processes loading the same instance share
+        the same pages.
+
+        Symmetric instances are stored packed (see Graph.from_matrix).
+
+        Files with the coordinate extension (.xy) are loaded as a
+        CoordinateGraph instead (see src/model/coordinate_graph.py), and
+        TSPLIB files (.tsp, .atsp) by load_tsplib (src/model/tsplib.py).
         """
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
 
+        from src.model.coordinate_graph import CoordinateGraph, COORDINATE_EXTENSION
+        from src.model.tsplib import load_tsplib, is_tsplib_file
+        if filepath.endswith(COORDINATE_EXTENSION):
+            return CoordinateGraph.load_from_file(filepath)
+        if is_tsplib_file(filepath):
+            return load_tsplib(filepath)
+
+        cache_path = Graph._cache_path(filepath) if use_cache else None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                weights = np.load(cache_path, mmap_mode='r')
+                if weights.ndim == 1:
+                    from src.model.packed_graph import PackedGraph, packed_vertices
+                    return PackedGraph(packed_vertices(len(weights)), weights)
+                return Graph(weights.shape[0], weights)
+            except (OSError, ValueError):
+                pass # Corrupted cache: parse the text file again
+
+        graph = Graph._parse_matrix_file(filepath)
+
+        if cache_path:
+            Graph._write_cache(cache_path, graph.stored_weights())
+
+        return graph
+
+    @staticmethod
+    def _parse_matrix_file(filepath):
+        """Parses the text matrix straight into an array (no per-token Python objects)."""
         with open(filepath, 'r') as f:
-            lines = f.readlines()
-            
-        # Parse n
+            # Parse n
+            try:
+                n = int(f.readline().strip())
+            except ValueError:
+                raise ValueError("First line must be the number of vertices (integer).")
+
+            # Parse adjacency matrix
+            try:
+                adjacency_matrix = np.loadtxt(f, dtype=np.float64, max_rows=n, ndmin=2)
+            except ValueError as e:
+                raise ValueError(f"Malformed adjacency matrix: {e}")
+
+        if adjacency_matrix.shape[0] < n:
+            raise ValueError(f"Expected {n} rows for the matrix, found fewer.")
+        if adjacency_matrix.shape[1] != n:
+            raise ValueError(f"Rows have {adjacency_matrix.shape[1]} elements, expected {n}.")
+
+        return Graph.from_matrix(adjacency_matrix)
+
+    @staticmethod
+    def _cache_path(filepath):
+        """
+        Path of the binary cache of an instance file:
+        <dir>/.tsp_cache/<file name>.<size>-<mtime_ns>.npy
+        Keyed on size and modification time, so editing the file invalidates it.
+        """
+        stat = os.stat(filepath)
+        directory, filename = os.path.split(os.path.abspath(filepath))
+        return os.path.join(directory, CACHE_DIRNAME, f"{filename}.{stat.st_size}-{stat.st_mtime_ns}.npy")
+
+    @staticmethod
+    def _write_cache(cache_path, adjacency_matrix):
+        """
+        Writes the cache atomically (temporary file + rename) so concurrent
+        processes never read a partial file, and removes stale entries of the
+        same instance. Failures (e.g. read-only directory) are silently ignored.
+        """
+        directory, cache_name = os.path.split(cache_path)
+        prefix = cache_name.rsplit('.', 2)[0] + '.'
         try:
-            n = int(lines[0].strip())
-        except ValueError:
-            raise ValueError("First line must be the number of vertices (integer).")
-
-        # Parse adjacency matrix
-        adjacency_matrix = []
-        for i in range(1, n + 1):
-            if i >= len(lines):
-                raise ValueError(f"Expected {n} rows for the matrix, found fewer.")
-            
-            row_str = lines[i].strip().split()
-            # Convert to float or int. Weights usually int in TSP examples but float is safer generally.
-            # Convert to float for generality, or int if strictly specified. Example uses ints.
-            # Let's use float to be safe, but print as int if it is int.
-            row = [float(x) for x in row_str]
-            
-            if len(row) != n:
-                raise ValueError(f"Row {i} has {len(row)} elements, expected {n}.")
-            
-            adjacency_matrix.append(row)
-
-        return Graph(n, adjacency_matrix)
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, adjacency_matrix)
+            os.replace(tmp_path, cache_path)
+
+            for entry in os.listdir(directory):
+                if entry.startswith(prefix) and entry != cache_name and entry.endswith('.npy'):
+                    os.remove(os.path.join(directory, entry))
+        except OSError:
+            pass
+
+    def to_shared_memory(self):
+        """
+        Copies the weights into a new multiprocessing.shared_memory block, so
+        worker processes can use the graph without receiving a pickled copy.
+        Returns (shm, spec): the owner must keep shm alive and call
+        shm.close() and shm.unlink() when done; spec is the small picklable
+        description given to Graph.from_shared_memory in the workers.
+        """
+        matrix = self.adjacency_matrix
+        shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[...] = matrix
+        spec = {'kind': 'matrix', 'name': shm.name, 'n': self.n, 'shape': matrix.shape, 'dtype': matrix.dtype.str}
+        return shm, spec
+
+    @staticmethod
+    def from_shared_memory(spec):
+        """
+        Attaches to a block created by to_shared_memory (no copy).
+        Returns (graph, shm): shm must stay referenced while the graph is used.
+        Meant for processes started by the owner (multiprocessing), which share
+        its resource tracker, so only the owner's unlink() releases the block.
+        """
+        # Other representations share their own arrays (see their to_shared_memory)
+        if spec['kind'] == 'coordinates':
+            from src.model.coordinate_graph import CoordinateGraph
+            return CoordinateGraph._attach_shared_memory(spec)
+        if spec['kind'] == 'packed':
+            from src.model.packed_graph import PackedGraph
+            return PackedGraph._attach_shared_memory(spec)
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        matrix = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+        return Graph(spec['n'], matrix), shm
+
+    def copy(self):
+        """New graph on the same weights (not copied), without the cached neighbor lists."""
+        return Graph(self.n, self.adjacency_matrix)
+
+    def stored_weights(self):
+        """The array holding the weights (what the binary cache saves)."""
+        return self.adjacency_matrix
 
     def get_weight(self, i, j):
-        """Returns the weight of edge (i, j). 0-indexed internally."""
-        # Adjust for 0-based indexing if input is 1-based? 
-        # Usually input indices in file might be just values. 
-        # Internally we will use 0 to n-1. 
-        # The output requirement asks for indices. 
-        # Let's assume internal logic uses 0..n-1.
-        return self.adjacency_matrix[i][j]
+        """Returns the weight of edge (i, j) as a Python scalar. 0-indexed internally."""
+        return self.adjacency_matrix.item(i, j)
+
+    def is_integral(self):
+        """True when every weight is an integer (stored with an integer dtype)."""
+        return self.adjacency_matrix.dtype.kind in 'iu'
+
+    def is_symmetric(self):
+        """True when w(i, j) == w(j, i) for every edge (checked once, then cached)."""
+        if self._symmetric is None:
+            self._symmetric = Graph._is_symmetric(self.adjacency_matrix)
+        return self._symmetric
+
+    def row(self, i):
+        """Returns the weights of all edges leaving i (read-only view in the stored dtype, no copy)."""
+        return self.adjacency_matrix[i]
+
+    def get_weights(self, us, vs):
+        """
+        Gathers the weights of a batch of edges (us[k], vs[k]).
+        Follows NumPy broadcasting, so get_weights(idx[:, None], idx[None, :])
+        returns the sub-matrix induced by idx.
+        Integer weights are returned as int64 (no overflow in the sums of
+        narrow stored weights).
+        """
+        weights = self.adjacency_matrix[np.asarray(us), np.asarray(vs)]
+        return weights.astype(np.int64, copy=False) if weights.dtype.kind == 'i' else weights
 
     def calculate_tour_cost(self, tour):
         """Calculates the cost of a tour (list of vertex indices)."""
-        cost = 0
-        for i in range(len(tour)):
-            u = tour[i]
-            v = tour[(i + 1) % len(tour)]
-            cost += self.get_weight(u, v)
-        return cost
+        if len(tour) == 0:
+            return 0
+        tour = np.asarray(tour)
+        return self.get_weights(tour, np.roll(tour, -1)).sum().item()
+
+    def neighbors(self, k=DEFAULT_NEIGHBORS):
+        """
+        Returns the k nearest neighbors of every vertex as an (n, k) int array,
+        each row sorted by increasing weight (ties broken by vertex index,
+        including at the k-th weight: every representation of the same
+        weights returns the same lists).
+        Computed once with a partial argsort per row and cached on the graph,
+        so every solver working on this graph reuses the same lists.
+        """
+        k = max(0, min(k, self.n - 1))
+        if k in self._neighbor_cache:
+            return self._neighbor_cache[k]
+
+        # A longer list already computed contains the answer
+        larger = [size for size in self._neighbor_cache if size > k]
+        if larger:
+            neighbor_lists = self._neighbor_cache[min(larger)][:, :k]
+        else:
+            neighbor_lists = self._compute_neighbors(k)
+
+        self._neighbor_cache[k] = neighbor_lists
+        return neighbor_lists
+
+    def _compute_neighbors(self, k):
+        neighbor_lists = np.empty((self.n, k), dtype=np.int32)
+        if k == 0:
+            return neighbor_lists
+
+        vertices = np.arange(self.n)
+        for start in range(0, self.n, NEIGHBOR_BLOCK_ROWS):
+            rows = np.arange(start, min(start + NEIGHBOR_BLOCK_ROWS, self.n))
+            block = self.get_weights(rows[:, None], vertices[None, :]).astype(np.float64)
+            # A vertex is not its own neighbor
+            block[np.arange(len(rows)), rows] = np.inf
+
+            # Partial sort: the k smallest of each row, sorted by (weight, index)
+            neighbor_lists[rows] = k_smallest_per_row(block, vertices, k)[0]
+
+        return neighbor_lists
@@ -0,0 +1,136 @@
+import cProfile
+import functools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+class Profiler:
+    """
+    Phase timings and counters of one run, plus an optional cProfile dump.
+    The solvers never refer to it: instrument() temporarily replaces a
+    function or method by a wrapper adding its run time to a phase and/or
+    its calls to a counter, and stop() puts the originals back. A run
+    without profiler executes the unmodified code (no cost when disabled).
+    Phases may nest (e.g. bound evaluation inside search): each one reports
+    its own total time.
+    """
+    def __init__(self, cprofile_path=None):
+        # name -> [total seconds, calls]
+        self.phases = {}
+        self.counters = {}
+        self.cprofile_path = cprofile_path
+        self._cprofile = None
+        # (owner, name, original, had_own_attribute) of the instrumented functions
+        self._patches = []
+
+    def start(self):
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        """Removes the instrumentation and writes the cProfile dump, if any."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+
+        for owner, name, original, had_own in reversed(self._patches):
+            if isinstance(owner, dict):
+                owner[name] = original
+            elif had_own:
+                setattr(owner, name, original)
+            else:
+                delattr(owner, name) # Was inherited or came from the class
+        self._patches = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, elapsed):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def instrument(self, owner, name, phase=None, counter=None, size=None, after=None):
+        """
+        Replaces owner.name (owner: module, class, object, or dict and key) by a wrapper:
+        - phase: its run time is added to this phase
+        - counter: its calls are counted (size(*args) added instead of 1 when given)
+        - after: called as after(result, *args) once it returns (e.g. to read
+          the counters of the instance).
+        """
+        is_dict = isinstance(owner, dict)
+        original = owner[name] if is_dict else getattr(owner, name)
+        had_own = is_dict or name in vars(owner)
+        profiler = self
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            if counter is not None:
+                profiler.count(counter, size(*args, **kwargs) if size else 1)
+            start = time.perf_counter()
+            try:
+                result = original(*args, **kwargs)
+            finally:
+                if phase is not None:
+                    profiler.add_time(phase, time.perf_counter() - start)
+            if after is not None:
+                after(result, *args)
+            return result
+
+        if is_dict:
+            owner[name] = wrapper
+        else:
+            setattr(owner, name, wrapper)
+        self._patches.append((owner, name, original, had_own))
+
+    def report(self):
+        return {
+            'phases': {name: {'time': round(total, 6), 'calls': calls}
+                       for name, (total, calls) in self.phases.items()},
+            'counters': dict(self.counters)
+        }
+
+    def format_report(self):
+        """Human readable report (phases by decreasing time, then counters)."""
+        lines = ["Profile:"]
+        for name, (total, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f"  {name:<28} {total:10.4f} s  {calls:>10} calls")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:<28} {value:>12}")
+        return "\n".join(lines)
+
+    def write(self, path, **metadata):
+        """Writes the report as one JSON object (metadata such as instance or algorithm first)."""
+        data = dict(metadata)
+        data.update(self.report())
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+def profile_phase(profiler, name):
+    """profiler.phase(name), or a no-op context when profiling is disabled (profiler is None)."""
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+def add_profiling_arguments(parser):
+    """--profile and --cprofile options shared by the command line scripts."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Print phase timings and counters of the run")
+    parser.add_argument("--cprofile", default=None,
+                        help="Also write cProfile statistics of the run to this file (pstats format)")
+
+def profiler_from_args(args):
+    """Profiler requested by the command line options (started), or None."""
+    if not (args.profile or args.cprofile):
+        return None
+    profiler = Profiler(args.cprofile)
+    profiler.start()
+    return profiler
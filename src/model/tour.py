@@ -0,0 +1,91 @@
+from array import array
+
+import numpy as np
+
+class Tour:
+    """
+    Cyclic tour stored as an array of cities plus the inverse position array,
+    so successor, predecessor and "is b between a and c" are O(1).
+    Used by the local searches to apply moves in place.
+    """
+    def __init__(self, cities):
+        self.n = len(cities)
+        # order[i] = city at position i, pos[city] = position of city
+        self.order = array('i', cities)
+        self.pos = array('i', bytes(self.order.itemsize * self.n))
+        for i, city in enumerate(self.order):
+            self.pos[city] = i
+
+    def __len__(self):
+        return self.n
+
+    def next(self, city):
+        """Successor of city."""
+        i = self.pos[city] + 1
+        return self.order[i if i < self.n else 0]
+
+    def prev(self, city):
+        """Predecessor of city."""
+        return self.order[self.pos[city] - 1]
+
+    def between(self, a, b, c):
+        """True if b lies on the path going from a to c (following the tour, ends included)."""
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def reverse(self, a, b):
+        """
+        Reverses the path going from a to b, in place.
+        The complementary path (succ(b) ... pred(a)) gives the same cycle when
+        reversed, so whichever of the two is shorter is flipped: the cycle is
+        the same, only its orientation may differ.
+        """
+        n = self.n
+        order, pos = self.order, self.pos
+        i, j = pos[a], pos[b]
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+
+        if i <= j:
+            # Contiguous block: reverse it with one slice copy
+            order[i:j + 1] = order[i:j + 1][::-1]
+            for k in range(i, j + 1):
+                pos[order[k]] = k
+        else:
+            # The block wraps around the end of the array: swap inwards
+            for _ in range(length // 2):
+                ci, cj = order[i], order[j]
+                order[i] = cj
+                pos[cj] = i
+                order[j] = ci
+                pos[ci] = j
+                i += 1
+                if i == n:
+                    i = 0
+                j -= 1
+                if j < 0:
+                    j = n - 1
+
+    def two_opt_move(self, a, b, c, d):
+        """
+        Replaces the tour edges (a, b) and (c, d) with (a, c) and (b, d).
+        Either b = next(a) and d = next(c), or b = prev(a) and d = prev(c).
+        """
+        if self.next(a) == b:
+            self.reverse(b, c) # a b ... c d -> a c ... b d
+        else:
+            self.reverse(a, d) # b a ... d c -> b d ... a c
+
+    def as_array(self):
+        """NumPy view (no copy) of the city order, it follows the moves applied in place."""
+        if self.n == 0:
+            return np.empty(0, dtype=np.intc)
+        return np.frombuffer(self.order, dtype=np.intc)
+
+    def to_list(self):
+        """The tour as a list of cities."""
+        return self.order.tolist()
@@ -0,0 +1,46 @@
+import json
+import time
+
+class ConvergenceTrace:
+    """
+    Anytime convergence trace of one solver run: the timestamped incumbent
+    improvements (seconds since the trace was created, cost) and the final
+    value of the solver's counters (iterations, kicks, nodes...).
+    Solvers take an optional trace and only touch it when a new best tour
+    is found, so the cost when enabled is one perf_counter call per
+    improvement, and nothing when trace is None.
+    """
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.improvements = []
+        self.counters = {}
+
+    def record(self, cost):
+        """Records a new incumbent cost (ignored when it does not improve the last one)."""
+        if not self.improvements or cost < self.improvements[-1][1]:
+            self.improvements.append((time.perf_counter() - self.start_time, cost))
+
+    def set_counter(self, name, value):
+        self.counters[name] = value
+
+    def best_cost(self):
+        return self.improvements[-1][1] if self.improvements else None
+
+    def to_dict(self):
+        return {
+            'improvements': [[round(elapsed, 6), cost] for elapsed, cost in self.improvements],
+            'counters': self.counters
+        }
+
+    def write(self, path, **metadata):
+        """Writes the trace as one JSON object (metadata such as instance or algorithm first)."""
+        data = dict(metadata)
+        data.update(self.to_dict())
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @staticmethod
+    def load(path):
+        """Reads a trace file. Returns the dict written by write."""
+        with open(path, 'r') as f:
+            return json.load(f)
@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+
+from src.model.graph import Graph
+from src.model.coordinate_graph import CoordinateGraph
+from src.model.packed_graph import PackedGraph, packed_size, packed_index
+
+# Extensions of the TSPLIB instance files (see load_tsplib)
+TSPLIB_EXTENSIONS = ('.tsp', '.atsp')
+
+# Extension of the TSPLIB tour files (see write_tour)
+TOUR_EXTENSION = '.tour'
+
+# Supported EDGE_WEIGHT_TYPE of coordinate instances -> CoordinateGraph metric
+COORDINATE_METRICS = {'EUC_2D': 'euc_2d', 'CEIL_2D': 'ceil_2d'}
+
+# Lines parsed at once in the EDGE_WEIGHT_SECTION (bounds temporary memory)
+PARSE_CHUNK_LINES = 4096
+
+# EDGE_WEIGHT_FORMAT of the triangular EXPLICIT instances: name -> (lower, diagonal).
+# The values are listed row by row over the upper triangle (lower False) or the
+# lower triangle (lower True), including the diagonal or not. A column by column
+# listing of one triangle is the row by row listing of the other.
+TRIANGULAR_FORMATS = {
+    'UPPER_ROW': (False, False), 'LOWER_COL': (False, False),
+    'UPPER_DIAG_ROW': (False, True), 'LOWER_DIAG_COL': (False, True),
+    'LOWER_ROW': (True, False), 'UPPER_COL': (True, False),
+    'LOWER_DIAG_ROW': (True, True), 'UPPER_DIAG_COL': (True, True)
+}
+
+def is_tsplib_file(filepath):
+    return filepath.lower().endswith(TSPLIB_EXTENSIONS)
+
+def load_tsplib(filepath):
+    """
+    Loads a TSPLIB instance:
+    - EDGE_WEIGHT_TYPE EUC_2D / CEIL_2D: CoordinateGraph on the NODE_COORD_SECTION
+    - EDGE_WEIGHT_TYPE EXPLICIT with a triangular EDGE_WEIGHT_FORMAT (see
+      TRIANGULAR_FORMATS): PackedGraph, the values being parsed by chunks
+      straight into the packed upper triangle
+    - EXPLICIT FULL_MATRIX: Graph.from_matrix (packed when symmetric)
+    """
+    header = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line == 'EOF':
+                break
+            keyword, _, value = line.partition(':')
+            keyword, value = keyword.strip().upper(), value.strip()
+
+            if keyword == 'NODE_COORD_SECTION':
+                return _read_coordinates(f, header)
+            if keyword == 'EDGE_WEIGHT_SECTION':
+                return _read_edge_weights(f, header)
+            if keyword.endswith('_SECTION'):
+                raise ValueError(f"Unsupported TSPLIB section before the weights: {keyword}")
+            header[keyword] = value
+
+    raise ValueError(f"No NODE_COORD_SECTION or EDGE_WEIGHT_SECTION in {filepath}")
+
+def _dimension(header):
+    try:
+        return int(header['DIMENSION'])
+    except (KeyError, ValueError):
+        raise ValueError("Missing or invalid DIMENSION in the TSPLIB header.")
+
+def _read_coordinates(f, header):
+    n = _dimension(header)
+    weight_type = header.get('EDGE_WEIGHT_TYPE', '').upper()
+    if weight_type not in COORDINATE_METRICS:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE for coordinates: {weight_type} "
+                         f"(expected one of {', '.join(COORDINATE_METRICS)})")
+
+    try:
+        # Lines "index x y"
+        nodes = np.loadtxt(f, dtype=np.float64, max_rows=n, ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"Malformed NODE_COORD_SECTION: {e}")
+    if nodes.shape != (n, 3):
+        raise ValueError(f"Expected {n} lines 'index x y' in NODE_COORD_SECTION, got shape {nodes.shape}")
+
+    coordinates = nodes[np.argsort(nodes[:, 0], kind='stable'), 1:]
+    return CoordinateGraph(coordinates, COORDINATE_METRICS[weight_type])
+
+def _parse_values(f, count):
+    """
+    Yields the next count numbers of f as float arrays, parsed by chunks of
+    PARSE_CHUNK_LINES lines (no Python object per value).
+    """
+    parsed = 0
+    lines = []
+    for line in f:
+        if line.lstrip()[:1].isalpha():
+            break # Next keyword or EOF
+        lines.append(line)
+        if len(lines) == PARSE_CHUNK_LINES:
+            values = np.fromstring(''.join(lines), sep=' ')
+            lines = []
+            yield values[:count - parsed]
+            parsed += len(values)
+            if parsed >= count:
+                return
+    values = np.fromstring(''.join(lines), sep=' ')
+    yield values[:count - parsed]
+    parsed += len(values)
+    if parsed < count:
+        raise ValueError(f"Expected {count} edge weights, found {parsed}.")
+
+def _lower_triangle_cells(positions, diagonal):
+    """
+    Row and column of the values at the given positions of the row by row
+    listing of the lower triangle (with the diagonal or not).
+    """
+    # With the diagonal, row i starts at position i (i + 1) / 2. Without it,
+    # the same listing with every row index shifted by one.
+    rows = ((np.sqrt(8 * positions + 1) - 1) / 2).astype(np.int64)
+    # Fix the floating point rounding of the square root
+    rows -= (rows * (rows + 1) // 2 > positions).astype(np.int64)
+    rows += ((rows + 1) * (rows + 2) // 2 <= positions).astype(np.int64)
+    cols = positions - rows * (rows + 1) // 2
+    return (rows if diagonal else rows + 1), cols
+
+def _read_edge_weights(f, header):
+    n = _dimension(header)
+    weight_type = header.get('EDGE_WEIGHT_TYPE', 'EXPLICIT').upper()
+    weight_format = header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX').upper()
+    if weight_type != 'EXPLICIT':
+        raise ValueError(f"EDGE_WEIGHT_SECTION with EDGE_WEIGHT_TYPE {weight_type} (expected EXPLICIT)")
+
+    if weight_format == 'FULL_MATRIX':
+        matrix = np.empty(n * n)
+        position = 0
+        for values in _parse_values(f, n * n):
+            matrix[position:position + len(values)] = values
+            position += len(values)
+        return Graph.from_matrix(matrix.reshape(n, n))
+
+    if weight_format not in TRIANGULAR_FORMATS:
+        raise ValueError(f"Unsupported EDGE_WEIGHT_FORMAT: {weight_format}")
+    lower, diagonal = TRIANGULAR_FORMATS[weight_format]
+
+    count = packed_size(n) - (0 if diagonal else n)
+    # The diagonal stays 0 when the format omits it
+    packed = np.zeros(packed_size(n))
+    position = 0
+    for values in _parse_values(f, count):
+        positions = np.arange(position, position + len(values))
+        position += len(values)
+        if lower:
+            # Row i lists (i, 0) ... (i, i - 1) [(i, i)]: edge (j, i) of the upper triangle
+            rows, cols = _lower_triangle_cells(positions, diagonal)
+            low, high = cols, rows
+        else:
+            # The upper listing read backwards is the lower listing of the
+            # cells (n - 1 - i, n - 1 - j)
+            rows, cols = _lower_triangle_cells(count - 1 - positions, diagonal)
+            low, high = n - 1 - rows, n - 1 - cols
+        packed[packed_index(n, low, high)] = values
+
+    return PackedGraph(n, packed)
+
+def write_tour(filepath, tour, name=None, comment=None):
+    """
+    Writes a tour (0-based vertex indices) in the TSPLIB .tour format, one
+    vertex per line, written as it goes (no string of the whole tour).
+    """
+    if name is None:
+        name = os.path.basename(filepath)
+    with open(filepath, 'w') as f:
+        f.write(f"NAME : {name}\n")
+        if comment:
+            f.write(f"COMMENT : {comment}\n")
+        f.write("TYPE : TOUR\n")
+        f.write(f"DIMENSION : {len(tour)}\n")
+        f.write("TOUR_SECTION\n")
+        for node in tour:
+            f.write(f"{node + 1}\n")
+        f.write("-1\nEOF\n")
+
+def read_tour(filepath):
+    """Reads a TSPLIB .tour file (e.g. a published optimal tour). Returns the 0-based tour."""
+    tour = []
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.strip().upper().startswith('TOUR_SECTION'):
+                break
+        else:
+            raise ValueError(f"No TOUR_SECTION in {filepath}")
+        for line in f:
+            for token in line.split():
+                node = int(token)
+                if node == -1:
+                    return tour
+                tour.append(node - 1)
+    return tour
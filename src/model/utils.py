@@ -1,8 +1,11 @@
 import os
 
+from src.model.tsplib import is_tsplib_file, write_tour, read_tour, TOUR_EXTENSION
+
 def write_solution(input_filepath, method_name, tour, cost):
     """
     Writes the solution to a file named {input_filename}_{method}.out
+    For a TSPLIB instance, also writes it as {input_filename}_{method}.tour
     
     Args:
         input_filepath: Path to the input file (to derive output name).
@@ -34,3 +37,33 @@ def write_solution(input_filepath, method_name, tour, cost):
             f.write(f"{cost}\n")
 
     print(f"Solution written to {output_filepath}")
+
+    if is_tsplib_file(input_filepath):
+        tour_filepath = os.path.join(directory, f"{base_name}_{method_name}{TOUR_EXTENSION}")
+        write_tour(tour_filepath, tour, comment=f"{method_name} tour of {os.path.basename(input_filepath)}, cost {cost}")
+        print(f"Tour written to {tour_filepath}")
+
+def read_solution(filepath):
+    """
+    Reads a solution file written by write_solution, or a TSPLIB .tour file
+    (e.g. a published optimal tour, cost None).
+
+    Returns:
+        (tour, cost): tour as 0-based vertex indices, cost as written
+        (None if the file has no cost line).
+    """
+    if filepath.endswith(TOUR_EXTENSION):
+        return read_tour(filepath), None
+
+    with open(filepath, 'r') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if not lines:
+        raise ValueError(f"Empty solution file: {filepath}")
+
+    tour = [int(token) - 1 for token in lines[0].split()]
+    cost = None
+    if len(lines) > 1:
+        cost = float(lines[1])
+        if cost == int(cost):
+            cost = int(cost)
+    return tour, cost
@@ -0,0 +1,156 @@
+import sys
+import time
+
+import numpy as np
+
+from src.model.tour import Tour
+from src.constructive.tsp_constructive import CONSTRUCTIONS
+from src.local_search.tsp_local_search import LOCAL_SEARCHES
+from src.grasp.tsp_grasp_ls import grasp_ls
+from src.lk.tsp_lk import lin_kernighan
+from src.exact.tsp_exact import TSPSolverExact, warm_start_tour, WARM_START_BUDGET
+
+# Uniform Python API of the solvers: solve(graph, timeout, seed, **params) -> (tour, cost)
+# timeout in seconds (None: the solver's default), seed for the randomized
+# solvers (ignored by the deterministic ones), params forwarded to the solver.
+# Defaults follow the command line scripts, so both give the same results.
+# Every solver also takes trace=None, an optional ConvergenceTrace
+# (src/model/trace.py) receiving its incumbent improvements and counters.
+
+def solve_exact(graph, timeout=600, seed=None, warm_start="lk", warm_start_budget=WARM_START_BUDGET, **params):
+    """Exact solver (branch and bound / Held-Karp); params: method, bound, memory_budget, workers."""
+    start_time = time.time()
+    timeout = 600 if timeout is None else timeout
+    initial_tour = warm_start_tour(graph, warm_start, min(warm_start_budget, timeout), seed)
+    solver = TSPSolverExact(graph, initial_tour)
+    # The warm start is part of the time budget
+    return solver.solve(timeout=max(0, timeout - (time.time() - start_time)), **params)
+
+def solve_constructive(graph, timeout=None, seed=None, method="nn", trace=None, **params):
+    """Construction heuristic (see CONSTRUCTIONS), nearest neighbor by default."""
+    tour, cost = CONSTRUCTIONS[method](graph, **params)
+    if trace is not None:
+        trace.record(cost)
+    return tour, cost
+
+def solve_local_search(graph, timeout=None, seed=None, neighborhood="2opt", init="multi_nn", trace=None, **params):
+    """Local search (see LOCAL_SEARCHES) from a constructed tour (see CONSTRUCTIONS), multi-start nearest neighbor by default."""
+    initial_tour, initial_cost = CONSTRUCTIONS[init](graph)
+    if trace is not None:
+        trace.record(initial_cost)
+    tour, cost = LOCAL_SEARCHES[neighborhood](graph, initial_tour, **params)
+    if trace is not None:
+        trace.record(cost)
+    return tour, cost
+
+def solve_grasp(graph, timeout=600, seed=None, max_iterations=10, alpha=0.3, **params):
+    """GRASP with local search; params: neighborhood, workers, target_cost."""
+    timeout = 600 if timeout is None else timeout
+    return grasp_ls(graph, max_iterations=max_iterations, alpha=alpha, timeout=timeout, seed=seed, **params)
+
+def solve_lk(graph, timeout=600, seed=None, init="nn", **params):
+    """Iterated Lin-Kernighan from a constructed tour; params: max_kicks, num_neighbors, max_depth."""
+    timeout = 600 if timeout is None else timeout
+    initial_tour, _ = CONSTRUCTIONS[init](graph)
+    return lin_kernighan(graph, initial_tour, timeout=timeout, seed=seed, **params)
+
+# Name (as used by benchmark.py and in the result files) -> solve function
+SOLVERS = {
+    "Exact": solve_exact,
+    "Constructive": solve_constructive,
+    "LocalSearch": solve_local_search,
+    "GRASP_LS": solve_grasp,
+    "LK": solve_lk
+}
+
+def solve(name, graph, timeout=None, seed=None, **params):
+    """Runs the registered solver name on graph. Returns (tour, cost)."""
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown solver: {name} (expected one of {', '.join(SOLVERS)})")
+    return SOLVERS[name](graph, timeout=timeout, seed=seed, **params)
+
+def _project_modules():
+    """
+    Loaded project modules. from-imports copy a function into every importing
+    module, and a script run directly is a second copy of its module
+    (__main__), so every reference has to be patched.
+    """
+    return [module for module_name, module in list(sys.modules.items())
+            if module_name == '__main__' or module_name.startswith('src.')]
+
+def _bound_objects(name):
+    """Distinct objects bound to name in the project modules."""
+    objects = []
+    for module in _project_modules():
+        obj = getattr(module, name, None)
+        if obj is not None and all(obj is not other for other in objects):
+            objects.append(obj)
+    return objects
+
+def _instrument_function(profiler, name, **kwargs):
+    for module in _project_modules():
+        if callable(getattr(module, name, None)):
+            profiler.instrument(module, name, **kwargs)
+
+def _instrument_method(profiler, class_name, name, **kwargs):
+    for cls in _bound_objects(class_name):
+        profiler.instrument(cls, name, **kwargs)
+
+def instrument_solvers(profiler, graph=None):
+    """
+    Standard instrumentation of a profiled run (see Profiler.instrument),
+    removed by profiler.stop():
+    - phases: construct, improve (local searches), warm start, root bound,
+      search, bound evaluation (spanning tree builds and repairs), held-karp
+    - counters: weight lookups of graph (scalar, and elements of the
+      batched gathers), 2-opt / Or-opt move deltas evaluated, moves applied
+      by the local searches and LK (an Or-opt move is one move, made of
+      2-3 segment reversals), segment reversals, 2-opt / Or-opt / LK tries
+      from an active city, kicks, and the branch and bound nodes.
+    Only this process is instrumented: worker processes are not profiled.
+    """
+    if graph is not None:
+        profiler.instrument(graph, 'get_weight', counter='weight lookups')
+        profiler.instrument(graph, 'get_weights', counter='weight lookups (batched)',
+                            size=lambda us, vs: np.broadcast(np.asarray(us), np.asarray(vs)).size)
+    profiler.instrument(Tour, 'reverse', counter='segment reversals')
+
+    for name in ('nearest_neighbor', 'multi_start_nearest_neighbor', 'greedy_edge', 'double_tree', 'space_filling_curve'):
+        _instrument_function(profiler, name, phase='construct')
+    for constructions in _bound_objects('CONSTRUCTIONS'):
+        for name in list(constructions):
+            profiler.instrument(constructions, name, phase='construct')
+    _instrument_function(profiler, 'randomized_nearest_neighbor_batch', phase='construct')
+    for local_searches in _bound_objects('LOCAL_SEARCHES'):
+        for name in list(local_searches):
+            profiler.instrument(local_searches, name, phase='improve')
+    def search_counters(moves, search, *args):
+        profiler.count('moves applied', moves)
+        profiler.count('2-opt deltas evaluated', search.two_opt_deltas)
+        profiler.count('Or-opt deltas evaluated', search.or_opt_deltas)
+
+    def full_scan_counters(result, *args):
+        delta, improving = result
+        profiler.count('2-opt deltas evaluated', delta.size)
+        if improving.size:
+            profiler.count('moves applied') # First improvement: one move per improving scan
+
+    _instrument_method(profiler, 'NeighborListSearch', 'run', after=search_counters)
+    _instrument_function(profiler, '_improving_2opt_moves', after=full_scan_counters)
+    _instrument_method(profiler, 'NeighborListSearch', 'try_2opt', counter='2-opt tries')
+    _instrument_method(profiler, 'NeighborListSearch', 'try_oropt', counter='Or-opt tries')
+    _instrument_method(profiler, 'LinKernighanSearch', 'try_lk', counter='LK tries')
+    _instrument_function(profiler, 'double_bridge', counter='kicks')
+
+    def node_counters(result, solver, *args, **kwargs):
+        profiler.count('bnb nodes expanded', solver.nodes_expanded)
+        profiler.count('bnb nodes pruned by bound', solver.nodes_pruned)
+        profiler.count('bnb nodes cut by cost', solver.nodes_cut)
+
+    _instrument_function(profiler, 'warm_start_tour', phase='warm start')
+    _instrument_function(profiler, 'held_karp', phase='held-karp')
+    _instrument_method(profiler, 'TSPSolverExact', 'solve', after=node_counters)
+    _instrument_method(profiler, 'TSPSolverExact', '_prepare_one_tree', phase='root bound')
+    _instrument_method(profiler, 'TSPSolverExact', '_branch_and_bound', phase='search')
+    _instrument_method(profiler, 'TSPSolverExact', '_minimum_spanning_tree', phase='bound evaluation')
+    _instrument_method(profiler, 'TSPSolverExact', '_remove_vertex', phase='bound evaluation')